@@ -0,0 +1,6 @@
+"""
+Benchmarks of the sampler and the exam generation on synthetic task pools.
+
+Run them with `python -m benchmarks.run --output results.json` and compare two runs
+with `python -m benchmarks.compare baseline.json results.json`.
+"""
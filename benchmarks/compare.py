@@ -0,0 +1,81 @@
+"""
+Compare two benchmark result files and report regressions.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.1]
+
+Exits with status 1 if the median of a benchmark got worse by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Tuple
+
+
+def load(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> List[Tuple]:
+    """
+    Compare the medians of the benchmarks that are in both results.
+
+    Returns:
+        List[Tuple]: The name, unit, baseline and candidate median, relative change and
+            whether it is a regression for each benchmark.
+    """
+    rows = []
+    for name, base in baseline["benchmarks"].items():
+        if name not in candidate["benchmarks"]:
+            continue
+        new = candidate["benchmarks"][name]
+        change = (new["median"] - base["median"]) / base["median"]
+        worse = -change if base["higher_is_better"] else change
+        rows.append(
+            (
+                name,
+                base["unit"],
+                base["median"],
+                new["median"],
+                change,
+                worse > threshold,
+            )
+        )
+    return rows
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change of a median that counts as a regression",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline["pools"] != candidate["pools"]:
+        print("Warning: the runs used different pools", file=sys.stderr)
+    if baseline["metadata"]["parameters"] != candidate["metadata"]["parameters"]:
+        print("Warning: the runs used different parameters", file=sys.stderr)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{'benchmark':<22} {'baseline':>12} {'candidate':>12} {'change':>8}")
+    for name, unit, base, new, change, regression in rows:
+        print(
+            f"{name:<22} {base:>12.6g} {new:>12.6g} {change:>+8.1%} {unit}"
+            + ("  REGRESSION" if regression else "")
+        )
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import os
+import random
+import shutil
+from dataclasses import asdict, dataclass
+from typing import List
+
+import nbformat
+from nbformat.v4 import new_code_cell, new_markdown_cell, new_notebook
+
+from examgenerator.tasks import Task
+
+SCRAMBLE = """import random
+
+
+def replacement_variables(seed):
+    rng = random.Random(seed)
+    return dict(value=rng.randint(0, 1000), name=rng.choice(["a", "b", "c"]))
+"""
+
+
+@dataclass
+class PoolSpec:
+    """Class for keeping the parameters of a synthetic task pool"""
+
+    pools: int = 10
+    tasks_per_pool: int = 10
+    cells_per_notebook: int = 10
+    data_files: int = 2
+    data_file_size: int = 4096
+    scramble: bool = True
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def nbgrader_metadata(cell, grade_id, grade=False, solution=False, points=None):
+    cell.metadata["nbgrader"] = dict(
+        grade=grade,
+        grade_id=grade_id,
+        locked=not solution,
+        schema_version=3,
+        solution=solution,
+        task=False,
+    )
+    if points is not None:
+        cell.metadata["nbgrader"]["points"] = points
+    return cell
+
+
+def random_bytes(rng: random.Random, size: int) -> bytes:
+    if size <= 0:
+        return b""
+    return rng.getrandbits(8 * size).to_bytes(size, "little")
+
+
+def make_notebook(task: Task, spec: PoolSpec, rng: random.Random):
+    """
+    Create the notebook of a synthetic task. The cells cycle through a description,
+    a solution and a graded test cell, every test is worth between one and three points.
+    """
+    nb = new_notebook()
+    variables = " {{ value }} {{ name }}" if spec.scramble else ""
+    for i in range(spec.cells_per_notebook):
+        grade_id = f"cell_{i}"
+        if i % 3 == 0:
+            cell = nbgrader_metadata(
+                new_markdown_cell(
+                    f"# {task.pool} {task.name} part {i // 3}\n"
+                    f"Load `data/file_0.csv` and print the result.{variables}"
+                ),
+                grade_id,
+            )
+        elif i % 3 == 1:
+            cell = nbgrader_metadata(
+                new_code_cell("# YOUR CODE HERE\nraise NotImplementedError()"),
+                grade_id,
+                solution=True,
+            )
+        else:
+            cell = nbgrader_metadata(
+                new_code_cell(
+                    "assert True\n### BEGIN HIDDEN TESTS\nassert True\n"
+                    "### END HIDDEN TESTS"
+                ),
+                grade_id,
+                grade=True,
+                points=rng.randint(1, 3),
+            )
+        cell.id = f"{task.pool}-{task.name}-{i}"
+        nb.cells.append(cell)
+    return nb
+
+
+def make_pools(root: str, spec: PoolSpec) -> List[Task]:
+    """
+    Create synthetic task pools in root, replacing anything that is already there.
+
+    Args:
+        root (str): The directory to create the pools in.
+        spec (PoolSpec): The size and contents of the pools.
+
+    Returns:
+        List[Task]: The created tasks.
+    """
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    rng = random.Random(spec.seed)
+    tasks = []
+    for p in range(spec.pools):
+        for t in range(spec.tasks_per_pool):
+            task = Task(pool=f"pool_{p}", name=f"task_{t}", root=root)
+            os.makedirs(os.path.join(task.path, "data"))
+            nbformat.write(make_notebook(task, spec, rng), task.notebook_path)
+            for i in range(spec.data_files):
+                with open(os.path.join(task.path, "data", f"file_{i}.csv"), "wb") as f:
+                    f.write(random_bytes(rng, spec.data_file_size))
+            if spec.scramble:
+                os.makedirs(os.path.join(task.path, "scramble"))
+                with open(os.path.join(task.path, "scramble", "__init__.py"), "w") as f:
+                    f.write(SCRAMBLE)
+            tasks.append(task)
+    return tasks
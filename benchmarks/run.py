@@ -0,0 +1,216 @@
+"""
+Measure the sampler latency and the exam generation throughput on synthetic pools.
+
+Usage:
+    python -m benchmarks.run --output results.json [--pools 20 --students 50 ...]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+from copy import copy
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, List
+
+from traitlets.config import Config
+
+from examgenerator import ExamGenerator
+from examgenerator.__version__ import __version__
+from examgenerator.sampling import TaskSampler
+from examgenerator.sampling.constraints import PoolConstraint, TasksPerPoolConstraint
+from examgenerator.tasks import SampledTaskGroup
+
+from .pools import PoolSpec, make_pools
+
+# Version of the format of the result files
+FORMAT_VERSION = 1
+
+
+def summarize(samples: List[float], unit: str = "s", higher_is_better=False) -> dict:
+    ordered = sorted(samples)
+    return dict(
+        unit=unit,
+        higher_is_better=higher_is_better,
+        n=len(ordered),
+        min=ordered[0],
+        median=statistics.median(ordered),
+        mean=statistics.mean(ordered),
+        p95=ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        max=ordered[-1],
+        samples=samples,
+    )
+
+
+def measure(func: Callable, repeat: int, warmup: int = 1) -> List[float]:
+    """Call func repeat times after warmup untimed calls and return the wall times"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def make_sampler(tasks, args):
+    # The sampler stores the points on the tasks, copies make it read the notebooks
+    return TaskSampler(
+        [copy(task) for task in tasks],
+        [TasksPerPoolConstraint(args.tasks_per_exam_pool)],
+        PoolConstraint(min(args.exam_pools, len({task.pool for task in tasks}))),
+    )
+
+
+def make_group(tasks, args):
+    return SampledTaskGroup(
+        tasks,
+        [TasksPerPoolConstraint(args.tasks_per_exam_pool)],
+        PoolConstraint(min(args.exam_pools, len({task.pool for task in tasks}))),
+        permute=True,
+    )
+
+
+def make_config(args):
+    config = Config()
+    config.ExamGenerator.copy_strategy = args.copy_strategy
+    config.ExamGenerator.keep_notebooks_in_memory = args.keep_notebooks_in_memory
+    return config
+
+
+def run_benchmarks(args, root: str) -> Dict[str, dict]:
+    spec = PoolSpec(
+        pools=args.pools,
+        tasks_per_pool=args.tasks_per_pool,
+        cells_per_notebook=args.cells,
+        data_files=args.data_files,
+        data_file_size=args.data_file_size,
+        scramble=not args.no_scramble,
+    )
+    tasks = make_pools(os.path.join(root, "pools"), spec)
+    results = dict()
+
+    results["sampler_construction"] = summarize(
+        measure(lambda: make_sampler(tasks, args), args.repeat)
+    )
+
+    sampler = make_sampler(tasks, args)
+    seeds = iter(range(args.samples + 1))
+    results["sampler_get_tasks"] = summarize(
+        measure(lambda: sampler.get_tasks(seed=next(seeds)), args.samples)
+    )
+
+    group = make_group(tasks, args)
+    students = {f"student_{i}": i for i in range(args.students)}
+    generator = ExamGenerator(os.path.join(root, "exams"), "exam", make_config(args))
+    make_exam_samples = []
+    for student, seed in students.items():
+        start = time.perf_counter()
+        generator.make_exam(student, group, seed=seed)
+        make_exam_samples.append(time.perf_counter() - start)
+    results["make_exam"] = summarize(make_exam_samples)
+
+    throughput = []
+    for i in range(args.repeat):
+        generator = ExamGenerator(
+            os.path.join(root, f"cohort_{i}"), "exam", make_config(args)
+        )
+        start = time.perf_counter()
+        outcome = generator.make_exams(students, group, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        failed = [result.error for result in outcome.values() if not result.succeeded]
+        if failed:
+            raise RuntimeError(f"Generating the cohort failed:\n{failed[0]}")
+        throughput.append(len(students) / elapsed)
+    results["cohort_throughput"] = summarize(
+        throughput, unit="exams/s", higher_is_better=True
+    )
+    return dict(pools=spec.to_dict(), benchmarks=results)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument(
+        "--scratch",
+        help="Directory for the pools and exams, created if it does not exist",
+    )
+    pools = parser.add_argument_group("synthetic pools")
+    pools.add_argument("--pools", type=int, default=10)
+    pools.add_argument("--tasks-per-pool", type=int, default=10)
+    pools.add_argument("--cells", type=int, default=10, help="Cells per notebook")
+    pools.add_argument("--data-files", type=int, default=2, help="Data files per task")
+    pools.add_argument(
+        "--data-file-size", type=int, default=4096, help="Size of a data file in bytes"
+    )
+    pools.add_argument(
+        "--no-scramble", action="store_true", help="Create tasks without a scrambler"
+    )
+    exams = parser.add_argument_group("exams")
+    exams.add_argument("--exam-pools", type=int, default=5, help="Pools per exam")
+    exams.add_argument(
+        "--tasks-per-exam-pool", type=int, default=1, help="Tasks per pool of an exam"
+    )
+    exams.add_argument("--students", type=int, default=20)
+    exams.add_argument("--workers", type=int, default=None)
+    exams.add_argument(
+        "--copy-strategy",
+        default="copy",
+        choices=["copy", "hardlink", "reflink", "symlink"],
+    )
+    exams.add_argument("--keep-notebooks-in-memory", action="store_true")
+    runs = parser.add_argument_group("repetitions")
+    runs.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Repetitions of the sampler construction and the cohort",
+    )
+    runs.add_argument(
+        "--samples", type=int, default=1000, help="Number of calls of get_tasks"
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.scratch is not None:
+        if os.path.exists(args.scratch) and not os.path.isdir(args.scratch):
+            parser.error(f"--scratch {args.scratch} is not a directory")
+        os.makedirs(args.scratch, exist_ok=True)
+    with TemporaryDirectory(dir=args.scratch) as root:
+        results = run_benchmarks(args, root)
+    report = dict(
+        format=FORMAT_VERSION,
+        metadata=dict(
+            examgenerator=__version__,
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpu_count=os.cpu_count(),
+            created=datetime.now(timezone.utc).isoformat(),
+            parameters={
+                key: value
+                for key, value in vars(args).items()
+                if key not in ["output", "scratch"]
+            },
+        ),
+        **results,
+    )
+    for name, result in report["benchmarks"].items():
+        print(
+            f"{name:<22} median {result['median']:.6g} {result['unit']} "
+            f"(min {result['min']:.6g}, p95 {result['p95']:.6g}, n={result['n']})"
+        )
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    return report
+
+
+if __name__ == "__main__":
+    main()
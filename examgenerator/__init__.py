@@ -1,3 +1,3 @@
-from .generator import ExamGenerator
+from .generator import ExamGenerator, ExamResult
 
-__all__ = ["ExamGenerator"]
+__all__ = ["ExamGenerator", "ExamResult"]
@@ -0,0 +1,26 @@
+from .archive import ArchiveBackend, TarBackend, ZipBackend
+from .base import BufferedBackend, OutputBackend
+from .local import LocalBackend
+from .objectstore import InMemoryObjectStore, ObjectStoreBackend, ObjectStoreClient
+
+
+def get_backend(resources):
+    """Get the output backend of a build, writing to `resources["dst"]` by default"""
+    backend = resources.get("backend")
+    if backend is None:
+        backend = LocalBackend(resources["dst"])
+    return backend
+
+
+__all__ = [
+    "ArchiveBackend",
+    "BufferedBackend",
+    "InMemoryObjectStore",
+    "LocalBackend",
+    "ObjectStoreBackend",
+    "ObjectStoreClient",
+    "OutputBackend",
+    "TarBackend",
+    "ZipBackend",
+    "get_backend",
+]
@@ -0,0 +1,93 @@
+import calendar
+import tarfile
+import threading
+import zipfile
+from io import BytesIO
+
+from .base import BufferedBackend, PathIndex
+
+# The modification time of all archive members, so archives of the same exams are equal
+MTIME = (1980, 1, 1, 0, 0, 0)
+
+
+class ArchiveBackend(BufferedBackend):
+    """
+    Base class of backends that stream the exams into an archive.
+    Each exam is written to the archive as soon as it is complete. Archives can only
+    be written by one thread at a time, so writes are serialized.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._names = PathIndex()
+        self._write_lock = threading.Lock()
+
+    def write(self, path, data):
+        raise NotImplementedError
+
+    def put(self, path, data):
+        with self._write_lock:
+            if path in self._names:
+                raise ValueError(f"{path} was already written to the archive")
+            self.write(path, data)
+            self._names.add(path)
+
+    def get(self, path):
+        raise ValueError(f"Can not read {path}, it was already written to the archive")
+
+    def contains(self, path):
+        with self._write_lock:
+            return path in self._names
+
+    def delete(self, path):
+        raise ValueError(
+            f"Can not remove {path}, it was already written to the archive"
+        )
+
+
+class ZipBackend(ArchiveBackend):
+    """
+    Write the exams into a zip archive.
+
+    Args:
+        path (str): The path of the archive.
+        compression (int, optional): The compression method of the zipfile module.
+            Defaults to zipfile.ZIP_DEFLATED.
+    """
+
+    def __init__(self, path, compression=zipfile.ZIP_DEFLATED):
+        super().__init__()
+        self.archive = zipfile.ZipFile(path, "w", compression=compression)
+
+    def write(self, path, data):
+        info = zipfile.ZipInfo(path, date_time=MTIME)
+        info.compress_type = self.archive.compression
+        info.external_attr = 0o600 << 16
+        self.archive.writestr(info, data)
+
+    def close(self):
+        self.archive.close()
+
+
+class TarBackend(ArchiveBackend):
+    """
+    Write the exams into a tar archive.
+
+    Args:
+        path (str): The path of the archive.
+        mode (str, optional): The mode of tarfile.open, e.g. "w:gz" for a compressed
+            archive. Defaults to "w".
+    """
+
+    def __init__(self, path, mode="w"):
+        super().__init__()
+        self.archive = tarfile.open(path, mode)
+
+    def write(self, path, data):
+        info = tarfile.TarInfo(path)
+        info.size = len(data)
+        info.mtime = calendar.timegm(MTIME)
+        self.archive.addfile(info, BytesIO(data))
+
+    def close(self):
+        self.archive.close()
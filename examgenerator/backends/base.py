@@ -0,0 +1,219 @@
+import io
+import os
+import threading
+from collections import Counter
+
+import nbformat
+
+from ..instrumentation import get_metrics
+
+
+class OutputBackend:
+    """
+    Base class of the destinations the exams are written to.
+
+    All paths are relative to the root of the output, e.g.
+    `release/<exam>/<student>/<exam>.ipynb`. The generator calls `commit` with the
+    directories of an exam once the exam is complete and `close` when it is done.
+    Backends are used by several threads at once, e.g. by `make_exams_async` and
+    by the task workers.
+
+    Attributes:
+        process_safe (bool): If True, the backend can be pickled and used by several
+            worker processes at once.
+    """
+
+    process_safe = False
+
+    def exists(self, path):
+        """Check if a file or directory exists in the output"""
+        raise NotImplementedError
+
+    def read(self, path):
+        """Read the content of a file in the output as bytes"""
+        raise NotImplementedError
+
+    def remove(self, path):
+        """Remove a file or directory from the output if it exists"""
+        raise NotImplementedError
+
+    def makedirs(self, path):
+        """Create a directory in the output, backends without directories ignore it"""
+
+    def add_file(self, src, path, strategy="copy", store=None):
+        """
+        Add a local file to the output.
+
+        Args:
+            src (str): The local file.
+            path (str): The path of the file in the output.
+            strategy (str, optional): The copy strategy, see
+                examgenerator.utils.copy_file. Defaults to "copy".
+            store (BlobStore, optional): A store to link the file to its blob.
+        """
+        raise NotImplementedError
+
+    def write_notebook(self, nb, path):
+        """Write a notebook to the output"""
+        raise NotImplementedError
+
+    def copy_tree(self, src, dst, strategy="copy"):
+        """Copy a directory of the output to another path of the output"""
+        raise NotImplementedError
+
+    def read_notebook(self, path):
+        return nbformat.reads(self.read(path).decode("utf-8"), nbformat.NO_CONVERT)
+
+    def same_content(self, src, path):
+        """Check if a local file has the same content as a file in the output"""
+        with open(src, "rb") as f:
+            return f.read() == self.read(path)
+
+    def commit(self, paths):
+        """Finish the directories of an exam, called once per exam"""
+
+    def close(self):
+        """Finish the output, called once when all exams are generated"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def is_within(path, directory):
+    """Check if a relative path is equal to a directory or inside of it"""
+    path = os.path.normpath(path)
+    directory = os.path.normpath(directory)
+    return path == directory or path.startswith(directory + os.path.sep)
+
+
+class PathIndex:
+    """
+    The relative paths of the files in an output. Checking if a file or directory
+    exists takes constant time, since the parent directories of all files are counted.
+    """
+
+    def __init__(self, paths=()):
+        self._files = set()
+        self._dirs = Counter()
+        for path in paths:
+            self.add(path)
+
+    @staticmethod
+    def parents(path):
+        parent = os.path.dirname(path)
+        while parent:
+            yield parent
+            parent = os.path.dirname(parent)
+
+    def add(self, path):
+        path = os.path.normpath(path)
+        if path not in self._files:
+            self._files.add(path)
+            self._dirs.update(self.parents(path))
+
+    def discard(self, path):
+        path = os.path.normpath(path)
+        if path in self._files:
+            self._files.remove(path)
+            for parent in self.parents(path):
+                self._dirs[parent] -= 1
+                if not self._dirs[parent]:
+                    del self._dirs[parent]
+
+    def within(self, path):
+        """Get the files that are equal to a path or inside of it"""
+        path = os.path.normpath(path)
+        if path in self._files:
+            return [path]
+        if path not in self._dirs:
+            return []
+        return sorted(name for name in self._files if is_within(name, path))
+
+    def __contains__(self, path):
+        path = os.path.normpath(path)
+        return path in self._files or path in self._dirs
+
+
+class BufferedBackend(OutputBackend):
+    """
+    Base class of backends that can not modify what they have written.
+
+    The files of an exam are buffered in memory until the exam is committed. Files
+    that are removed before, e.g. the solution files of the release, never reach the
+    output. Subclasses implement `put`, `delete` and `contains` for committed files.
+    """
+
+    def __init__(self):
+        self._pending = dict()
+        self._lock = threading.Lock()
+
+    def put(self, path, data):
+        """Write a committed file"""
+        raise NotImplementedError
+
+    def delete(self, path):
+        """Remove committed files at or below a path"""
+        raise NotImplementedError
+
+    def contains(self, path):
+        """Check if committed files exist at or below a path"""
+        raise NotImplementedError
+
+    def get(self, path):
+        """Read a committed file"""
+        raise NotImplementedError
+
+    def _pending_within(self, path):
+        return [name for name in self._pending if is_within(name, path)]
+
+    def exists(self, path):
+        with self._lock:
+            if self._pending_within(path):
+                return True
+        return self.contains(path)
+
+    def read(self, path):
+        path = os.path.normpath(path)
+        with self._lock:
+            if path in self._pending:
+                return self._pending[path]
+        return self.get(path)
+
+    def remove(self, path):
+        with self._lock:
+            for name in self._pending_within(path):
+                del self._pending[name]
+        if self.contains(path):
+            self.delete(path)
+
+    def add_file(self, src, path, strategy="copy", store=None):
+        with open(src, "rb") as f:
+            data = f.read()
+        get_metrics().add("bytes_copied", len(data))
+        with self._lock:
+            self._pending[os.path.normpath(path)] = data
+
+    def write_notebook(self, nb, path):
+        get_metrics().add("notebook_writes")
+        buffer = io.StringIO()
+        nbformat.write(nb, buffer)
+        with self._lock:
+            self._pending[os.path.normpath(path)] = buffer.getvalue().encode("utf-8")
+
+    def copy_tree(self, src, dst, strategy="copy"):
+        with self._lock:
+            for name in self._pending_within(src):
+                target = os.path.join(dst, os.path.relpath(name, src))
+                self._pending[os.path.normpath(target)] = self._pending[name]
+
+    def commit(self, paths):
+        with self._lock:
+            names = sorted(
+                {name for path in paths for name in self._pending_within(path)}
+            )
+            entries = [(name, self._pending.pop(name)) for name in names]
+        for name, data in entries:
+            self.put(name, data)
@@ -0,0 +1,66 @@
+import os
+import shutil
+
+import nbformat
+
+from ..instrumentation import get_metrics
+from ..utils import break_link, copy_output_file, copy_tree, same_content
+from .base import OutputBackend
+
+
+class LocalBackend(OutputBackend):
+    """
+    Write the exams to a directory of the local filesystem.
+
+    Args:
+        root (str): The output directory. Absolute paths are used as they are.
+    """
+
+    process_safe = True
+
+    def __init__(self, root=""):
+        self.root = root
+
+    def path(self, path):
+        return os.path.join(self.root, path)
+
+    def exists(self, path):
+        return os.path.exists(self.path(path))
+
+    def read(self, path):
+        with open(self.path(path), "rb") as f:
+            return f.read()
+
+    def read_notebook(self, path):
+        get_metrics().add("notebook_reads")
+        return nbformat.read(self.path(path), as_version=nbformat.NO_CONVERT)
+
+    def same_content(self, src, path):
+        return same_content(src, self.path(path))
+
+    def remove(self, path):
+        path = self.path(path)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.remove(path)
+
+    def makedirs(self, path):
+        os.makedirs(self.path(path), exist_ok=True)
+
+    def add_file(self, src, path, strategy="copy", store=None):
+        dst = self.path(path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if store is not None:
+            store.link(store.add(src), dst)
+        else:
+            copy_output_file(src, dst, strategy=strategy, copy_function=shutil.copyfile)
+
+    def write_notebook(self, nb, path):
+        dst = self.path(path)
+        get_metrics().add("notebook_writes")
+        break_link(dst)
+        nbformat.write(nb, dst)
+
+    def copy_tree(self, src, dst, strategy="copy"):
+        copy_tree(self.path(src), self.path(dst), strategy=strategy, output=True)
@@ -0,0 +1,102 @@
+import os
+import threading
+
+from .base import BufferedBackend, PathIndex
+
+
+class ObjectStoreClient:
+    """
+    Interface of an S3-like object store.
+    Keys are flat strings, directories only exist as common key prefixes.
+    """
+
+    def put_object(self, key, data):
+        raise NotImplementedError
+
+    def get_object(self, key):
+        raise NotImplementedError
+
+    def delete_object(self, key):
+        raise NotImplementedError
+
+    def list_objects(self, prefix=""):
+        """Get the keys starting with prefix"""
+        raise NotImplementedError
+
+
+class InMemoryObjectStore(ObjectStoreClient):
+    """An object store in memory, e.g. to test the ObjectStoreBackend"""
+
+    def __init__(self):
+        self.objects = dict()
+        self._lock = threading.Lock()
+
+    def put_object(self, key, data):
+        with self._lock:
+            self.objects[key] = bytes(data)
+
+    def get_object(self, key):
+        with self._lock:
+            return self.objects[key]
+
+    def delete_object(self, key):
+        with self._lock:
+            self.objects.pop(key, None)
+
+    def list_objects(self, prefix=""):
+        with self._lock:
+            return sorted(key for key in self.objects if key.startswith(prefix))
+
+
+class ObjectStoreBackend(BufferedBackend):
+    """
+    Write the exams to an object store. Each exam is uploaded once it is complete.
+    The keys below the prefix are listed once, when the output is first checked for
+    existing files, and kept up to date by the backend afterwards.
+
+    Args:
+        client (ObjectStoreClient): The client of the object store.
+        prefix (str, optional): The prefix of all keys. Defaults to "".
+    """
+
+    def __init__(self, client, prefix=""):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    def key(self, path):
+        key = os.path.normpath(path).replace(os.path.sep, "/")
+        if self.prefix:
+            key = "{}/{}".format(self.prefix.rstrip("/"), key)
+        return key
+
+    def get_index(self):
+        """Get the index of the committed files, listing the store on first use"""
+        if self._index is None:
+            prefix = self.prefix.rstrip("/") + "/" if self.prefix else ""
+            self._index = PathIndex(
+                key[len(prefix) :] for key in self.client.list_objects(prefix)
+            )
+        return self._index
+
+    def put(self, path, data):
+        self.client.put_object(self.key(path), data)
+        with self._index_lock:
+            if self._index is not None:
+                self._index.add(path)
+
+    def get(self, path):
+        return self.client.get_object(self.key(path))
+
+    def contains(self, path):
+        with self._index_lock:
+            return path in self.get_index()
+
+    def delete(self, path):
+        with self._index_lock:
+            index = self.get_index()
+            for name in index.within(path):
+                self.client.delete_object(self.key(name))
+                index.discard(name)
@@ -1,15 +1,30 @@
+import asyncio
+import copy
+import cProfile
+import json
 import os
+import threading
+import traceback
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from multiprocessing.util import Finalize
 from tempfile import TemporaryDirectory
+from typing import Any, Dict, Mapping, Optional
 
-import nbformat
 from e2xauthoring.converters import Converter
 from e2xgrader.preprocessors import ClearHiddenTests, ClearSolutions
 from nbgrader.preprocessors import ClearMarkScheme, ClearOutput, LockCells
-from traitlets import List
+from traitlets import Bool, Enum, Integer, List, Unicode
 from traitlets.config import Configurable
 from traitlets.utils.importstring import import_item
 
+from .__version__ import __version__
+from .backends import LocalBackend, TarBackend, ZipBackend
+from .instrumentation import NULL_METRICS, Metrics, get_metrics, use_metrics
 from .preprocessors import (
+    CompileTasks,
     CopyFiles,
     CopyTasks,
     GenerateTaskIDs,
@@ -19,12 +34,49 @@ from .preprocessors import (
     RemoveSolutionFiles,
     ScrambleTasks,
 )
+from .utils import COPY_STRATEGIES, BlobStore, TreeHasher, Workspace, fingerprint
+
+
+@dataclass
+class ExamResult:
+    """Class for keeping the outcome of generating the exam of a single student"""
+
+    student: str
+    seed: Any = None
+    tasks: list = field(default_factory=list)
+    error: Optional[str] = None
+    skipped: bool = False
+    metrics: Optional[list] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+# Generator used by the worker processes of ExamGenerator.make_exams
+_worker_generator = None
+
+
+def _init_worker(generator_class, dst, exam_name, config, backend):
+    global _worker_generator
+    _worker_generator = generator_class(dst, exam_name, config=config, backend=backend)
+    # Worker processes do not run atexit handlers
+    Finalize(None, _worker_generator.close_workspace, exitpriority=0)
+
+
+def _run_worker(student, tasks, seed, scramble_variables):
+    result = _worker_generator.build_exam_safe(
+        student, tasks, seed, scramble_variables=scramble_variables
+    )
+    result.metrics = _worker_generator.metrics.drain()
+    return result
 
 
 class ExamGenerator(Converter):
     preprocessors = List(
         [
             RemoveExam,
+            CompileTasks,
             CopyTasks,
             ScrambleTasks,
             CopyFiles,
@@ -37,14 +89,183 @@ class ExamGenerator(Converter):
     sanitizers = List(
         [ClearOutput, ClearSolutions, LockCells, ClearMarkScheme, ClearHiddenTests]
     ).tag(config=True)
+    keep_notebooks_in_memory = Bool(
+        False,
+        help=(
+            "Parse each task notebook once and pass it through the preprocessors in "
+            "memory instead of writing it back to disk after every preprocessor"
+        ),
+    ).tag(config=True)
+    copy_strategy = Enum(
+        COPY_STRATEGIES,
+        default_value="copy",
+        help=(
+            "How task directories and exam files are copied. Files shared via "
+            "hardlinks, reflinks or symlinks are copied before the pipeline modifies them"
+        ),
+    ).tag(config=True)
+    scratch_dir = Unicode(
+        None,
+        allow_none=True,
+        help=(
+            "Directory in which the scratch directories for each student are created. "
+            "Put it on the same filesystem as the tasks to make use of hardlinks"
+        ),
+    ).tag(config=True)
+    reuse_workspace = Bool(
+        False,
+        help=(
+            "Build all exams in a scratch workspace in `scratch_dir` that keeps a "
+            "pristine copy of each task. The tasks of a student are hardlinked to the "
+            "pristine copies and only the files the pipeline modified are reset for "
+            "the next student"
+        ),
+    ).tag(config=True)
+    task_workers = Integer(
+        None,
+        allow_none=True,
+        help=(
+            "The number of threads that process the tasks of an exam concurrently. "
+            "Name collisions of files are resolved in the order of the tasks, so the "
+            "exams are the same as with serial processing. If None or 1, the tasks "
+            "are processed serially"
+        ),
+    ).tag(config=True)
+    deduplicate_files = Bool(
+        False,
+        help=(
+            "Store the files of all students in a content-addressed store in "
+            "`<dst>/.store` and link them into the exam directories"
+        ),
+    ).tag(config=True)
+    incremental = Bool(
+        False,
+        help=(
+            "Record a fingerprint of the inputs of each exam and skip students whose "
+            "fingerprint did not change since their exam was last built"
+        ),
+    ).tag(config=True)
 
-    def __init__(self, dst, exam_name, config=None):
+    output_backend = Enum(
+        ["local", "zip", "tar"],
+        default_value="local",
+        help=(
+            "Where to write the exams. 'local' writes a directory tree to dst, "
+            "'zip' and 'tar' stream the exams into an archive at dst. "
+            "Other backends can be passed to the constructor"
+        ),
+    ).tag(config=True)
+    collect_metrics = Bool(
+        False,
+        help=(
+            "Record the wall time of each preprocessor per student and task, the bytes "
+            "copied, the notebooks read and written and the time spent in scramblers. "
+            "The measurements are available in `ExamGenerator.metrics`"
+        ),
+    ).tag(config=True)
+    profile_student = Unicode(
+        None,
+        allow_none=True,
+        help=(
+            "Run the generation of the exam of this student under cProfile and write "
+            "the statistics to `<profile_dir>/<student>.prof`"
+        ),
+    ).tag(config=True)
+    profile_dir = Unicode(
+        ".", help="Directory the cProfile statistics are written to"
+    ).tag(config=True)
+
+    # Traits that only change how the exams are generated, not the generated exams
+    output_independent_traits = [
+        "keep_notebooks_in_memory",
+        "copy_strategy",
+        "scratch_dir",
+        "reuse_workspace",
+        "task_workers",
+        "collect_metrics",
+        "profile_student",
+        "profile_dir",
+    ]
+
+    def __init__(self, dst, exam_name, config=None, backend=None):
         if config is not None:
             self.config = config
         self.dst_base = dst
         self.exam_name = exam_name
+        self.backend = backend if backend is not None else self.init_backend()
+        if not isinstance(self.backend, LocalBackend) and (
+            self.deduplicate_files or self.incremental
+        ):
+            raise ValueError(
+                "deduplicate_files and incremental require a local output backend"
+            )
         self._preprocessors = self.init_preprocessors(self.preprocessors)
         self._sanitizers = self.init_preprocessors(self.sanitizers)
+        self._tree_hasher = TreeHasher()
+        self._workspace = None
+        self._workspace_dir = None
+        self._resource_lock = threading.Lock()
+        self._task_executor = None
+        self._store = None
+        self.metrics = Metrics() if self.collect_metrics else NULL_METRICS
+
+    def init_backend(self):
+        if self.output_backend == "zip":
+            return ZipBackend(self.dst_base)
+        if self.output_backend == "tar":
+            return TarBackend(self.dst_base)
+        return LocalBackend(self.dst_base)
+
+    def close(self):
+        """Finish the output, e.g. write the end of an archive"""
+        self.close_workspace()
+        if self._task_executor is not None:
+            self._task_executor.shutdown()
+            self._task_executor = None
+        self.backend.close()
+
+    def get_task_executor(self):
+        """Get the thread pool that processes the tasks of an exam, None if disabled"""
+        if self.task_workers is None or self.task_workers <= 1:
+            return None
+        with self._resource_lock:
+            if self._task_executor is None:
+                self._task_executor = ThreadPoolExecutor(max_workers=self.task_workers)
+            return self._task_executor
+
+    def get_workspace(self):
+        """Get the scratch workspace shared by all exams, creating it on first use"""
+        with self._resource_lock:
+            if self._workspace is None:
+                self._workspace_dir = TemporaryDirectory(dir=self.scratch_dir)
+                self._workspace = Workspace(
+                    self._workspace_dir.name, strategy=self.copy_strategy
+                )
+            return self._workspace
+
+    def close_workspace(self):
+        """Remove the scratch workspace"""
+        with self._resource_lock:
+            if self._workspace_dir is not None:
+                self._workspace_dir.cleanup()
+            self._workspace = None
+            self._workspace_dir = None
+
+    @contextmanager
+    def scratch(self):
+        """Get a scratch directory to build an exam in"""
+        if self.reuse_workspace:
+            with self.get_workspace().slot() as path:
+                yield path
+        else:
+            with TemporaryDirectory(dir=self.scratch_dir) as path:
+                yield path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     def init_preprocessor(self, preprocessor):
         if isinstance(preprocessor, type):
@@ -61,11 +282,318 @@ class ExamGenerator(Converter):
             _preprocessors.append(proc)
         return _preprocessors
 
-    def make_exam(self, student, tasks, seed=None, source=False):
+    def clear_kernelspec_cache(self):
+        """Look up the kernelspecs again, e.g. after a kernel was installed"""
+        for preprocessor in self._preprocessors:
+            if isinstance(preprocessor, MakeExam):
+                preprocessor.clear_cache()
+
+    def make_exam(self, student, tasks, seed=None, source=False) -> bool:
+        """
+        Generate the exam of a single student.
+
+        Args:
+            student (str): The name of the student.
+            tasks: The task group to sample the tasks of the student from.
+            seed (int, optional): The seed for sampling and scrambling the tasks.
+                Defaults to None.
+            source (bool, optional): If True, the source exam is generated instead.
+                Defaults to False.
+
+        Returns:
+            bool: False if the exam was skipped because it is up to date with
+                `incremental`, True if it was built.
+        """
         tasks = tasks.get_tasks(seed=seed, source=source)
-        os.path.join(self.dst_base, student)
+        return self.build_exam(student, tasks, seed=seed, source=source)
+
+    def make_exams(
+        self, students: Mapping[str, Any], tasks, workers: int = None
+    ) -> Dict[str, ExamResult]:
+        """
+        Generate the exams of a whole cohort.
+
+        The tasks of every student are sampled up front in this process, the exams are
+        then built in a pool of worker processes. A failing student does not abort the
+        batch, the error is reported in the result of that student instead.
+
+        Scramblers that define `replacement_variables_batch(seeds)` are called up front
+        as well, once per task for all students that received the task. The hook must
+        return the same variables as calling `replacement_variables(seed)` for each
+        seed. All other scramblers are called when the exam is built. With
+        `incremental`, students whose exams are up to date are skipped before any
+        scrambler is called.
+
+        Args:
+            students (Mapping[str, Any]): A mapping from student names to seeds.
+            tasks: The task group to sample the tasks of each student from.
+            workers (int, optional): The number of worker processes. If None or 1, the
+                exams are built sequentially in this process. Worker processes require
+                a process safe output backend. Defaults to None.
+
+        Returns:
+            Dict[str, ExamResult]: The result for each student in the order of `students`.
+        """
+        if workers is not None and workers > 1 and not self.backend.process_safe:
+            raise ValueError(
+                f"{type(self.backend).__name__} can not be used by worker processes"
+            )
+        results, jobs = self.prepare_jobs(students, tasks)
+
+        if workers is None or workers <= 1:
+            for job in jobs:
+                results[job[0]] = self.build_exam_safe(*job)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(
+                    type(self),
+                    self.dst_base,
+                    self.exam_name,
+                    self.get_worker_config(),
+                    self.backend,
+                ),
+            ) as executor:
+                futures = [(job, executor.submit(_run_worker, *job)) for job in jobs]
+                for (student, _, seed, _), future in futures:
+                    try:
+                        results[student] = future.result()
+                        self.metrics.merge(results[student].metrics or [])
+                        results[student].metrics = None
+                    except Exception:
+                        results[student] = ExamResult(
+                            student=student, seed=seed, error=traceback.format_exc()
+                        )
+        return {student: results[student] for student in students}
+
+    def get_worker_config(self):
+        """
+        Get the config for the generators of the worker processes. It includes the
+        values of the traits, so traits that were set on this instance apply as well.
+        """
+        config = copy.deepcopy(self.config)
+        for name in self.trait_names(config=True):
+            config[type(self).__name__][name] = getattr(self, name)
+        return config
+
+    async def make_exams_async(
+        self, students: Mapping[str, Any], tasks, concurrency: int = 4, executor=None
+    ) -> Dict[str, ExamResult]:
+        """
+        Generate the exams of a whole cohort with an asyncio pipeline.
+
+        The exams are built in a pool of threads, so the file copies of some students
+        overlap with the notebook processing of others. At most `concurrency` exams are
+        in flight at once, the remaining students wait in a bounded queue.
+
+        Args:
+            students (Mapping[str, Any]): A mapping from student names to seeds.
+            tasks: The task group to sample the tasks of each student from.
+            concurrency (int, optional): The number of exams built at the same time.
+                Defaults to 4.
+            executor (concurrent.futures.ThreadPoolExecutor, optional): The thread pool
+                to build the exams in. If None, a pool with `concurrency` threads is
+                used.
+
+        Returns:
+            Dict[str, ExamResult]: The result for each student in the order of `students`.
+        """
+        loop = asyncio.get_running_loop()
+        results, jobs = await loop.run_in_executor(
+            None, self.prepare_jobs, students, tasks
+        )
+        queue = asyncio.Queue(maxsize=concurrency)
+
+        async def produce():
+            for job in jobs:
+                await queue.put(job)
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def consume(pool):
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                results[job[0]] = await loop.run_in_executor(
+                    pool, self.build_exam_safe, *job
+                )
+
+        pool = executor or ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            await asyncio.gather(
+                produce(), *[consume(pool) for _ in range(concurrency)]
+            )
+        finally:
+            if executor is None:
+                pool.shutdown()
+        return {student: results[student] for student in students}
+
+    def prepare_jobs(self, students: Mapping[str, Any], tasks):
+        """
+        Sample the tasks of all students and compute the scramble variables of the
+        scramblers that define a batch hook. With `incremental`, students whose exams
+        are up to date are skipped before any scrambler is called.
+
+        Returns:
+            Tuple[Dict[str, ExamResult], List[tuple]]: The results of the students whose
+                tasks could not be sampled or scrambled or who are up to date, and the
+                student, tasks, seed and scramble variables of all other students.
+        """
+        results = dict()
+        jobs = []
+        for student, seed in students.items():
+            try:
+                sampled_tasks = tasks.get_tasks(seed=seed)
+                if self.incremental and self.is_up_to_date(
+                    student, self.get_fingerprint(sampled_tasks, seed)
+                ):
+                    results[student] = ExamResult(
+                        student=student,
+                        seed=seed,
+                        tasks=[task.relpath for task in sampled_tasks],
+                        skipped=True,
+                    )
+                    continue
+                jobs.append((student, sampled_tasks, seed))
+            except Exception:
+                results[student] = ExamResult(
+                    student=student, seed=seed, error=traceback.format_exc()
+                )
+        scramble_variables, errors = self.get_scramble_variables(jobs)
+        for student, sampled_tasks, seed in jobs:
+            if student in errors:
+                results[student] = ExamResult(
+                    student=student,
+                    seed=seed,
+                    tasks=[task.relpath for task in sampled_tasks],
+                    error=errors[student],
+                )
+        return results, [
+            job + (scramble_variables[job[0]],) for job in jobs if job[0] not in errors
+        ]
+
+    def get_scramble_variables(self, jobs):
+        """
+        Compute the scramble variables of the scramblers that define
+        `replacement_variables_batch`. Each of them is called once for all students that
+        received its task. Other scramblers are called by ScrambleTasks when the exam is
+        built, e.g. in a worker process.
+
+        If the batch hook fails, all students that received the task fail.
+
+        Args:
+            jobs (List[Tuple[str, List[Task], Any]]): The student, sampled tasks and seed
+                of each exam.
+
+        Returns:
+            Tuple[Dict[str, Dict[str, dict]], Dict[str, str]]: The variables of each
+                student by task relpath and the traceback of each failed student.
+        """
+        variables = defaultdict(dict)
+        errors = dict()
+        scramble = next(
+            (proc for proc in self._preprocessors if isinstance(proc, ScrambleTasks)),
+            None,
+        )
+        if scramble is None:
+            return variables, errors
+        students_per_task = defaultdict(list)
+        for student, tasks, seed in jobs:
+            for task in tasks:
+                if task.is_randomizable:
+                    students_per_task[task.path].append((task, student, seed))
+        for entries in students_per_task.values():
+            with use_metrics(self.metrics), get_metrics().time(
+                "scrambler", task=entries[0][0].relpath
+            ):
+                batch, error = self.get_task_scramble_variables(scramble, entries)
+            if error is not None:
+                for _, student, _ in entries:
+                    errors.setdefault(student, error)
+            elif batch is not None:
+                for (task, student, _), task_variables in zip(entries, batch):
+                    variables[student][task.relpath] = task_variables
+        return variables, errors
+
+    def get_task_scramble_variables(self, scramble, entries):
+        """
+        Compute the scramble variables of one task for several students with the batch
+        hook of its scrambler.
+
+        Returns:
+            Tuple[List[dict], str]: The variables of each entry, None if the scrambler
+                does not define a batch hook, and the traceback if the hook failed.
+        """
+        try:
+            with scramble.use_scrambler(entries[0][0], dict()) as scrambler:
+                if not hasattr(scrambler, "replacement_variables_batch"):
+                    return None, None
+                batch = scrambler.replacement_variables_batch(
+                    [seed for _, _, seed in entries]
+                )
+            assert len(batch) == len(
+                entries
+            ), "replacement_variables_batch returned the wrong number of variables"
+            return batch, None
+        except Exception:
+            return None, traceback.format_exc()
 
-        with TemporaryDirectory() as tmp:
+    def build_exam_safe(
+        self, student, tasks, seed=None, scramble_variables=None
+    ) -> ExamResult:
+        """Build the exam of a student from sampled tasks and report errors in the result"""
+        result = ExamResult(
+            student=student, seed=seed, tasks=[task.relpath for task in tasks]
+        )
+        try:
+            result.skipped = not self.build_exam(
+                student, tasks, seed=seed, scramble_variables=scramble_variables
+            )
+        except Exception:
+            result.error = traceback.format_exc()
+        return result
+
+    def build_exam(
+        self, student, tasks, seed=None, source=False, scramble_variables=None
+    ):
+        """
+        Build the exam of a student from a list of already sampled tasks.
+
+        If `collect_metrics` is set, each preprocessor and sanitizer is timed. If the
+        student is the `profile_student`, the build runs under cProfile.
+
+        Args:
+            scramble_variables (Dict[str, dict], optional): Precomputed scramble
+                variables by task relpath, e.g. from a batch hook of the scramblers.
+
+        Returns:
+            bool: False if the exam was skipped because it is up to date, True otherwise.
+        """
+        with use_metrics(self.metrics):
+            if self.profile_student is None or student != self.profile_student:
+                return self._build_exam(
+                    student, tasks, seed, source, scramble_variables
+                )
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(
+                    self._build_exam, student, tasks, seed, source, scramble_variables
+                )
+            finally:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profile.dump_stats(os.path.join(self.profile_dir, f"{student}.prof"))
+
+    def _build_exam(self, student, tasks, seed, source, scramble_variables):
+        exam_fingerprint = None
+        if self.incremental and not source:
+            exam_fingerprint = self.get_fingerprint(tasks, seed)
+            if self.is_up_to_date(student, exam_fingerprint):
+                return False
+            self.remove_build_state(student)
+
+        with self.scratch() as tmp:
             resources = dict(
                 student=student,
                 seed=seed,
@@ -73,21 +601,153 @@ class ExamGenerator(Converter):
                 tmp_dir=tmp,
                 tasks=tasks,
                 replacements=dict(),
+                scramble_variables=scramble_variables or dict(),
                 dst=self.dst_base,
                 exam_name=self.exam_name,
+                notebooks=dict() if self.keep_notebooks_in_memory else None,
+                copy_strategy=self.copy_strategy,
+                store=self.get_store(),
+                backend=self.backend,
+                workspace=self._workspace if self.reuse_workspace else None,
+                task_executor=self.get_task_executor(),
+                tree_hasher=self._tree_hasher,
             )
             for preprocessor in self._preprocessors:
-                resources = preprocessor.preprocess(resources)
+                with self.metrics.time(type(preprocessor).__name__, student=student):
+                    resources = preprocessor.preprocess(resources)
+            self.report_scramble_variables(student, resources)
             if source:
-                return
-            exam_path = os.path.join(
-                resources["dst"],
+                self.backend.commit([os.path.join("source", self.exam_name)])
+                return True
+            exam_path = resources.get("exam_path") or os.path.join(
                 "release",
                 resources["exam_name"],
                 resources["student"],
                 f"{self.exam_name}.ipynb",
             )
-            nb = nbformat.read(exam_path, as_version=nbformat.NO_CONVERT)
+            nb = resources.get("exam")
+            if nb is None:
+                nb = self.backend.read_notebook(exam_path)
             for preprocessor in self._sanitizers:
-                nb, _ = preprocessor.preprocess(nb, dict())
-            nbformat.write(nb, exam_path)
+                with self.metrics.time(type(preprocessor).__name__, student=student):
+                    nb, _ = preprocessor.preprocess(nb, dict())
+            with self.metrics.time("WriteRelease", student=student):
+                self.backend.write_notebook(nb, exam_path)
+            self.backend.commit(
+                [
+                    os.path.dirname(exam_path),
+                    os.path.join("solution", self.exam_name, student),
+                ]
+            )
+            if resources["store"] is not None:
+                resources["store"].write_manifest(
+                    self.exam_name,
+                    student,
+                    os.path.join(self.dst_base, os.path.dirname(exam_path)),
+                )
+        if exam_fingerprint is not None:
+            self.write_build_state(student, exam_fingerprint, tasks)
+        return True
+
+    def report_scramble_variables(self, student, resources):
+        """Log scramble variables without a value and values without a variable"""
+        for task, report in resources.get("scramble_report", dict()).items():
+            if report["unknown"]:
+                self.log.warning(
+                    "Scramble variables without a value in task %s of %s: %s",
+                    task,
+                    student,
+                    ", ".join(report["unknown"]),
+                )
+            if report["unused"]:
+                self.log.debug(
+                    "Unused scramble variables in task %s of %s: %s",
+                    task,
+                    student,
+                    ", ".join(report["unused"]),
+                )
+
+    def get_fingerprint(self, tasks, seed=None):
+        """
+        Compute the fingerprint of the inputs of an exam. It covers the seed, the
+        sampled tasks and the content of their directories, the configuration of the
+        generator and the version of the package.
+        """
+
+        def name(obj):
+            return f"{type(obj).__module__}.{type(obj).__qualname__}"
+
+        return fingerprint(
+            dict(
+                version=__version__,
+                seed=seed,
+                tasks=[
+                    dict(
+                        task=task.relpath,
+                        points=task.points,
+                        content=self._tree_hasher.hash_tree(task.path),
+                    )
+                    for task in tasks
+                ],
+                preprocessors=[name(proc) for proc in self._preprocessors],
+                sanitizers=[name(proc) for proc in self._sanitizers],
+                traits={
+                    trait: getattr(self, trait)
+                    for trait in self.trait_names(config=True)
+                    if trait not in self.output_independent_traits
+                },
+                config=self.get_fingerprint_config(),
+            )
+        )
+
+    def get_fingerprint_config(self):
+        """
+        Get the config of the other configurables. The sections of the generator are
+        left out, since the values of its traits are part of the fingerprint already.
+        """
+        sections = {cls.__name__ for cls in type(self).mro()}
+        return {
+            section: value
+            for section, value in self.config.items()
+            if section not in sections
+        }
+
+    def build_state_path(self, student):
+        return os.path.join(self.dst_base, ".build", self.exam_name, f"{student}.json")
+
+    def is_up_to_date(self, student, exam_fingerprint):
+        """Check if the exam of a student was built from inputs with the same fingerprint"""
+        path = self.build_state_path(student)
+        if not os.path.exists(path):
+            return False
+        with open(path, "r") as f:
+            state = json.load(f)
+        return state.get("fingerprint") == exam_fingerprint and all(
+            os.path.exists(os.path.join(self.dst_base, folder, self.exam_name, student))
+            for folder in ["release", "solution"]
+        )
+
+    def write_build_state(self, student, exam_fingerprint, tasks):
+        path = self.build_state_path(student)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = dict(
+            fingerprint=exam_fingerprint,
+            tasks=[task.relpath for task in tasks],
+            version=__version__,
+        )
+        with open(path, "w") as f:
+            json.dump(state, f, indent=1)
+
+    def remove_build_state(self, student):
+        path = self.build_state_path(student)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_store(self):
+        """Get the content-addressed store for the files of the students if enabled"""
+        if not self.deduplicate_files:
+            return None
+        with self._resource_lock:
+            if self._store is None:
+                self._store = BlobStore(os.path.join(self.dst_base, ".store"))
+            return self._store
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# The stage, student and task a measurement is recorded for
+Labels = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+class NullMetrics:
+    """Metrics that record nothing, used when instrumentation is disabled"""
+
+    enabled = False
+
+    @contextmanager
+    def time(self, stage, student=None, task=None):
+        yield
+
+    def add(self, name, value=1):
+        pass
+
+    def drain(self):
+        return []
+
+    def merge(self, records):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+_metrics = ContextVar("examgenerator_metrics", default=NULL_METRICS)
+_labels = ContextVar("examgenerator_metrics_labels", default=(None, None, None))
+
+
+def get_metrics():
+    """Get the metrics of the current context, a NullMetrics if none are collected"""
+    return _metrics.get()
+
+
+@contextmanager
+def use_metrics(metrics):
+    """Collect the measurements of the current context in the given metrics"""
+    token = _metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _metrics.reset(token)
+
+
+class Metrics:
+    """
+    Measurements of an exam generation run, by stage, student and task.
+
+    Stages are timed with `time`, which also makes the stage, student and task the
+    labels of all counters that are added while it runs, e.g. the bytes copied or the
+    notebooks read and written. Labels that are not given are inherited from the
+    enclosing stage.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._records = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage, student=None, task=None):
+        outer = _labels.get()
+        labels = (stage, student or outer[1], task or outer[2])
+        token = _labels.set(labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _labels.reset(token)
+            with self._lock:
+                record = self._records[labels]
+                record["seconds"] += elapsed
+                record["calls"] += 1
+
+    def add(self, name, value=1):
+        """Add a value to a counter of the current stage, student and task"""
+        with self._lock:
+            self._records[_labels.get()][name] += value
+
+    def drain(self) -> List[Tuple[Labels, Dict[str, float]]]:
+        """Remove and return all records, e.g. to send them from a worker process"""
+        with self._lock:
+            records = [
+                (labels, dict(values)) for labels, values in self._records.items()
+            ]
+            self._records.clear()
+        return records
+
+    def merge(self, records: List[Tuple[Labels, Dict[str, float]]]):
+        """Add records drained from other metrics"""
+        with self._lock:
+            for labels, values in records:
+                for name, value in values.items():
+                    self._records[tuple(labels)][name] += value
+
+    def to_dict(self) -> dict:
+        """
+        Get all records and the totals per stage.
+
+        The time of a stage is measured as a whole and per task. The totals of a stage
+        only count the time per task if the stage was not timed as a whole.
+
+        Returns:
+            dict: A dict with a list of `records`, each with the stage, student, task
+                and the counters, and the summed counters of each stage in `stages`.
+        """
+        with self._lock:
+            items = sorted(
+                ((labels, dict(values)) for labels, values in self._records.items()),
+                key=lambda item: tuple(label or "" for label in item[0]),
+            )
+        timed_as_whole = {stage for (stage, _, task), values in items if task is None}
+        stages = defaultdict(lambda: defaultdict(int))
+        records = []
+        for (stage, student, task), values in items:
+            records.append(dict(stage=stage, student=student, task=task, **values))
+            for name, value in values.items():
+                if (
+                    name in ["seconds", "calls"]
+                    and task is not None
+                    and stage in timed_as_whole
+                ):
+                    continue
+                stages[stage or ""][name] += value
+        return dict(
+            records=records,
+            stages={stage: dict(values) for stage, values in stages.items()},
+        )
+
+    def to_json(self, path=None, indent=1) -> str:
+        """Export the metrics as JSON and write them to path if given"""
+        text = json.dumps(self.to_dict(), indent=indent)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, path=None, prefix="examgenerator") -> str:
+        """Export the metrics in the Prometheus text format and write them to path if given"""
+
+        def escape(value):
+            return (
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n")
+            )
+
+        def number(value):
+            # Integer counters are exported exactly and durations with all digits
+            return str(value) if isinstance(value, int) else repr(float(value))
+
+        samples = defaultdict(list)
+        for record in self.to_dict()["records"]:
+            labels = ",".join(
+                f'{name}="{escape(record[name])}"'
+                for name in ["stage", "student", "task"]
+                if record[name] is not None
+            )
+            for name, value in record.items():
+                if name not in ["stage", "student", "task"]:
+                    samples[name].append(
+                        f"{prefix}_{name}_total{{{labels}}} {number(value)}"
+                    )
+        lines = []
+        for name in sorted(samples):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.extend(samples[name])
+        text = "\n".join(lines) + "\n"
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
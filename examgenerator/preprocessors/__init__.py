@@ -1,3 +1,4 @@
+from .compiletasks import CompiledTask, CompileTasks
 from .copyfiles import CopyFiles
 from .copytasks import CopyTasks
 from .generatetaskids import GenerateTaskIDs
@@ -8,6 +9,8 @@ from .removesolutionfiles import RemoveSolutionFiles
 from .scrambletasks import ScrambleTasks
 
 __all__ = [
+    "CompiledTask",
+    "CompileTasks",
     "CopyFiles",
     "CopyTasks",
     "GenerateTaskIDs",
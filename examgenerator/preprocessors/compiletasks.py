@@ -0,0 +1,97 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import nbformat
+from e2xgrader.utils.nbgrader_cells import get_valid_name
+
+from ..instrumentation import get_metrics
+from .copyfiles import CopyFiles
+from .generatetaskids import GenerateTaskIDs
+from .scrambletasks import ScrambleTemplate, compile_template
+
+
+@dataclass
+class CompiledTask:
+    """Class for keeping the seed independent results of preparing a task"""
+
+    grade_ids: Dict[int, str] = field(default_factory=dict)
+    templates: List[ScrambleTemplate] = field(default_factory=list)
+    files: List[str] = field(default_factory=list)
+
+
+class CompileTasks:
+    """
+    Prepare each task once and reuse the result for every student.
+
+    The grade ids of the cells, the scramble templates of the cells and the files
+    to copy do not depend on the seed. They are computed from the task in the pool
+    and cached in memory until the notebook or one of the directories of the files
+    to copy changes. The compiled tasks are passed to the other preprocessors in
+    `resources["compiled_tasks"]`.
+    """
+
+    def __init__(self):
+        self._compiled = dict()
+        self._lock = threading.Lock()
+
+    def compile(self, task):
+        get_metrics().add("notebook_reads")
+        nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
+        name = get_valid_name("_".join([task.pool, task.name]))
+        return CompiledTask(
+            grade_ids=GenerateTaskIDs().get_ids(nb, name),
+            templates=[compile_template(cell.source) for cell in nb.cells],
+            files=CopyFiles().get_files(task.path),
+        )
+
+    def list_directories(self, task):
+        """Get the directories the files to copy are listed from, even missing ones"""
+        directories = []
+        for subdir in CopyFiles.file_dirs:
+            directories.append(os.path.join(task.path, subdir))
+            for root, dirs, _ in os.walk(directories[-1]):
+                dirs[:] = [d for d in dirs if d not in [".ipynb_checkpoints"]]
+                directories.extend(os.path.join(root, d) for d in dirs)
+        return directories
+
+    def get_stamp(self, task, directories):
+        """Get the inode, size and modification time of the notebook and directories"""
+        stamp = []
+        for path in [task.notebook_path] + directories:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stamp.append(None)
+            else:
+                stamp.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return stamp
+
+    def get_compiled_task(self, task):
+        # The compiled task only depends on the notebook and on the names of the files.
+        # Adding or removing a file modifies its directory, so the directories are
+        # only walked again if one of them changed.
+        with self._lock:
+            cached = self._compiled.get(task.relpath)
+        if cached is not None:
+            directories, stamp, compiled = cached
+            if self.get_stamp(task, directories) == stamp:
+                return compiled
+        directories = self.list_directories(task)
+        stamp = self.get_stamp(task, directories)
+        compiled = self.compile(task)
+        with self._lock:
+            self._compiled[task.relpath] = (directories, stamp, compiled)
+        return compiled
+
+    def clear_cache(self):
+        with self._lock:
+            self._compiled.clear()
+
+    def preprocess(self, resources):
+        compiled_tasks = resources.setdefault("compiled_tasks", dict())
+        for task in resources["tasks"]:
+            with get_metrics().time("CompileTasks", task=task.relpath):
+                compiled_tasks[task.relpath] = self.get_compiled_task(task)
+        return resources
@@ -1,8 +1,9 @@
-import filecmp
 import os
-import shutil
+import re
 
-import nbformat
+from ..backends import LocalBackend, get_backend
+from ..instrumentation import get_metrics
+from ..utils import map_tasks, read_notebook, same_content, write_notebook
 
 
 def get_import_path(file_path):
@@ -15,7 +16,18 @@ def get_import_path(file_path):
 
 
 class CopyFiles:
-    def rename(self, task, old_name, new_name):
+    # The directories of a task whose files are copied to the exam
+    file_dirs = ["img", "data", "solution"]
+
+    def get_renames(self, old_name, new_name):
+        """
+        Get the strings to replace in a notebook when a file is renamed
+        Arguments:
+            old_name -- path of the file relative to the task
+            new_name -- path of the file relative to the exam
+        Returns:
+            renames -- dict mapping old strings to new strings
+        """
         if os.path.splitext(old_name)[-1] == ".py":
             old_file_name = get_import_path(old_name)
             new_file_name = get_import_path(new_name)
@@ -23,16 +35,29 @@ class CopyFiles:
             old_file_name = os.path.split(old_name)[1]
             new_file_name = os.path.split(new_name)[1]
 
-        nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
+        renames = {old_name: new_name}
+        if old_file_name != new_file_name:
+            renames[old_file_name] = new_file_name
+        return renames
+
+    def replace_names(self, nb, renames):
+        """
+        Replace all names in a notebook with a single pass over each cell.
+        Longer names take precedence over names they contain.
+        """
+        if not renames:
+            return
+        pattern = re.compile(
+            "|".join(re.escape(name) for name in sorted(renames, key=len, reverse=True))
+        )
         for cell in nb.cells:
-            cell.source = cell.source.replace(old_name, new_name)
-            if old_file_name != new_file_name:
-                cell.source = cell.source.replace(old_file_name, new_file_name)
-        nbformat.write(nb, task.notebook_path)
+            cell.source = pattern.sub(
+                lambda match: renames[match.group(0)], cell.source
+            )
 
     def get_files(self, task, source=False, ignored_file_extensions=[".pyc"]):
         finds = []
-        subdirs = ["img", "data", "solution"]
+        subdirs = list(self.file_dirs)
         if source:
             subdirs = [
                 d for d in subdirs if not d.startswith(".") and d not in ["scramble"]
@@ -45,61 +70,155 @@ class CopyFiles:
                         finds.append(os.path.relpath(os.path.join(root, file), task))
         return finds
 
-    def get_new_name(self, file, dst):
+    def get_new_name(self, file, dst, backend=None, taken=()):
+        backend = backend or LocalBackend()
         suffix = 1
         name, extension = os.path.splitext(file)
         new_name = "{}_{}{}".format(name, suffix, extension)
-        while os.path.exists(os.path.join(dst, new_name)):
+        while os.path.join(dst, new_name) in taken or backend.exists(
+            os.path.join(dst, new_name)
+        ):
             suffix += 1
             new_name = "{}_{}{}".format(name, suffix, extension)
         return new_name
 
-    def copyfile(self, src, dst):
+    def copyfile(self, src, dst, strategy="copy", store=None, backend=None):
         """
         Copy file
         Arguments:
             src -- source file
-            dst -- destination file
+            dst -- destination file, relative to the output of the backend
+            strategy -- copy strategy, see examgenerator.utils.copy_file
+            store -- optional BlobStore, the file is then linked to its blob
+            backend -- optional OutputBackend, defaults to the local filesystem
         Returns:
             status -- True if dst does not exists or is equal to src,
                       False if dst exists and differs from src.
                       In this case nothing is copied
         """
-        if os.path.exists(dst):
-            return filecmp.cmp(src, dst)
-        dirs = os.path.split(dst)[0]
-        os.makedirs(dirs, exist_ok=True)
-        shutil.copyfile(src, dst)
+        backend = backend or LocalBackend()
+        if backend.exists(dst):
+            return backend.same_content(src, dst)
+        backend.add_file(src, dst, strategy=strategy, store=store)
         return True
 
-    def copyfiles(self, task, dst, source=False):
+    def list_files(self, task, resources):
+        """Get the files of a task, from the compiled task if it was not modified"""
+        compiled = resources.get("compiled_tasks", dict()).get(task.relpath)
+        if compiled is not None and task.relpath not in resources.get(
+            "modified_tasks", set()
+        ):
+            return compiled.files
+        return self.get_files(task.path, source=resources["source"])
+
+    def rename_files(self, task, renames, resources):
+        """Rename all files in the notebook of a task at once"""
+        if renames:
+            nb = read_notebook(task, resources)
+            self.replace_names(nb, renames)
+            write_notebook(task, nb, resources)
+
+    def copyfiles(self, task, dst, resources):
         exercise_base = "files"
         src = task.path
-        for file in self.get_files(src, source=source):
+        renames = dict()
+        strategy = resources.get("copy_strategy", "copy")
+        store = resources.get("store")
+        backend = get_backend(resources)
+        for file in self.list_files(task, resources):
             src_file = os.path.join(src, file)
             dst_file = os.path.join(dst, file)
             new_name = os.path.join(exercise_base, file)
-            if not self.copyfile(src_file, dst_file):
+            if not self.copyfile(src_file, dst_file, strategy, store, backend):
                 # File with that name already exists
-                renamed = self.get_new_name(file, dst)
-                self.copyfile(src_file, os.path.join(dst, renamed))
+                renamed = self.get_new_name(file, dst, backend)
+                self.copyfile(
+                    src_file, os.path.join(dst, renamed), strategy, store, backend
+                )
                 new_name = os.path.join(exercise_base, renamed)
-            # Rename in notebook
-            self.rename(task, file, new_name)
+            for old, new in self.get_renames(file, new_name).items():
+                renames.setdefault(old, new)
+        self.rename_files(task, renames, resources)
+
+    def plan_file(self, src, dst, planned, backend):
+        """
+        Plan to copy a file, the counterpart of `copyfile` for files that are copied
+        later. Planned files count as existing files.
+
+        Returns:
+            status -- True if dst is free or will have the same content as src,
+                      False otherwise. In this case nothing is planned
+        """
+        if dst in planned:
+            return same_content(src, planned[dst])
+        if backend.exists(dst):
+            return backend.same_content(src, dst)
+        planned[dst] = src
+        return True
+
+    def plan_files(self, tasks, dst, resources):
+        """
+        Decide the names of the files of all tasks in the files directory of the exam.
+        Collisions are resolved in the order of the tasks, like in a serial copy.
+
+        Returns:
+            copies -- dict mapping the relpath of each task to a list of its
+                      source files and their destinations
+            renames -- dict mapping the relpath of each task to its renames
+        """
+        exercise_base = "files"
+        backend = get_backend(resources)
+        planned = dict()
+        copies = dict()
+        renames = dict()
+        for task in tasks:
+            task_copies = copies[task.relpath] = []
+            task_renames = renames[task.relpath] = dict()
+            for file in self.list_files(task, resources):
+                src_file = os.path.join(task.path, file)
+                dst_file = os.path.join(dst, file)
+                new_name = os.path.join(exercise_base, file)
+                if not self.plan_file(src_file, dst_file, planned, backend):
+                    # File with that name already exists
+                    renamed = self.get_new_name(file, dst, backend, taken=planned)
+                    dst_file = os.path.join(dst, renamed)
+                    self.plan_file(src_file, dst_file, planned, backend)
+                    new_name = os.path.join(exercise_base, renamed)
+                if planned.get(dst_file) == src_file:
+                    task_copies.append((src_file, dst_file))
+                for old, new in self.get_renames(file, new_name).items():
+                    task_renames.setdefault(old, new)
+        return copies, renames
+
+    def copyfiles_concurrently(self, dst, resources):
+        """Copy the files of all tasks concurrently after planning their names"""
+        copies, renames = self.plan_files(resources["tasks"], dst, resources)
+        strategy = resources.get("copy_strategy", "copy")
+        store = resources.get("store")
+        backend = get_backend(resources)
+
+        def copy_task_files(task):
+            with get_metrics().time("CopyFiles", task=task.relpath):
+                for src_file, dst_file in copies[task.relpath]:
+                    backend.add_file(src_file, dst_file, strategy=strategy, store=store)
+                self.rename_files(task, renames[task.relpath], resources)
+
+        map_tasks(copy_task_files, resources["tasks"], resources)
 
     def preprocess(self, resources):
         dst = os.path.join(
-            resources["dst"],
             "release",
             resources["exam_name"],
             resources["student"],
             "files",
         )
         if resources["source"]:
-            dst = os.path.join(
-                resources["dst"], "source", resources["exam_name"], "files"
-            )
-        os.makedirs(dst, exist_ok=True)
+            dst = os.path.join("source", resources["exam_name"], "files")
+        get_backend(resources).makedirs(dst)
+        if resources.get("task_executor") is not None:
+            self.copyfiles_concurrently(dst, resources)
+            return resources
         for task in resources["tasks"]:
-            self.copyfiles(task, dst, resources["source"])
+            with get_metrics().time("CopyFiles", task=task.relpath):
+                self.copyfiles(task, dst, resources)
         return resources
@@ -1,12 +1,30 @@
 import os
-import shutil
+
+from ..instrumentation import get_metrics
+from ..utils import copy_tree, map_tasks
 
 
 class CopyTasks:
+    def copy_task(self, task, resources):
+        dst = os.path.join(resources["tmp_dir"], task.relpath)
+        workspace = resources.get("workspace")
+        with get_metrics().time("CopyTasks", task=task.relpath):
+            if workspace is not None:
+                workspace.checkout(task.path, dst)
+            else:
+                copy_tree(
+                    task.path, dst, strategy=resources.get("copy_strategy", "copy")
+                )
+
     def preprocess(self, resources):
-        for task in resources["tasks"]:
-            src = task.path
-            dst = os.path.join(resources["tmp_dir"], task.relpath)
-            shutil.copytree(src, dst)
+        sources = resources.setdefault("task_sources", dict())
+        tasks = resources["tasks"]
+        workspace = resources.get("workspace")
+        if workspace is not None:
+            # The slot may hold the tasks of earlier students
+            workspace.prune(resources["tmp_dir"], [task.relpath for task in tasks])
+        map_tasks(lambda task: self.copy_task(task, resources), tasks, resources)
+        for task in tasks:
+            sources[task.relpath] = task.path
             task.root = resources["tmp_dir"]
         return resources
@@ -1,4 +1,3 @@
-import nbformat
 from e2xgrader.utils.nbgrader_cells import (
     get_task_info,
     get_valid_name,
@@ -7,12 +6,23 @@ from e2xgrader.utils.nbgrader_cells import (
     is_solution,
 )
 
+from ..instrumentation import get_metrics
+from ..utils import map_tasks, read_notebook, write_notebook
+
 
 class GenerateTaskIDs:
-    def generate_ids(self, nb, name):
+    def get_ids(self, nb, name):
+        """
+        Get the grade ids of the cells of a task notebook.
+        The ids only depend on the name and the structure of the notebook.
+
+        Returns:
+            Dict[int, str]: The grade id for each index of a cell that gets one.
+        """
         task = get_task_info(nb)
 
         ids = []
+        grade_ids = dict()
         suffix = ord("A")
 
         for subtask in task["subtasks"]:
@@ -24,28 +34,42 @@ class GenerateTaskIDs:
             for idx in subtask:
                 cell = nb.cells[idx]
                 if is_description(cell):
-                    cell.metadata.nbgrader.grade_id = "{}_Description{}".format(
-                        subtask_id, headers
-                    )
+                    grade_ids[idx] = "{}_Description{}".format(subtask_id, headers)
                     headers += 1
                 elif is_solution(cell):
-                    cell.metadata.nbgrader.grade_id = subtask_id
+                    grade_ids[idx] = subtask_id
                 elif is_grade(cell):
-                    cell.metadata.nbgrader.grade_id = "test_{}{}".format(
-                        subtask_id, tests
-                    )
+                    grade_ids[idx] = "test_{}{}".format(subtask_id, tests)
                     tests += 1
 
         if "header" in task:
-            header = nb.cells[task["header"]]
-            header.metadata.nbgrader.grade_id = "{}_Header".format("".join(ids))
+            grade_ids[task["header"]] = "{}_Header".format("".join(ids))
+
+        return grade_ids
 
+    def apply_ids(self, nb, grade_ids):
+        for idx, grade_id in grade_ids.items():
+            nb.cells[idx].metadata.nbgrader.grade_id = grade_id
         return nb
 
+    def generate_ids(self, nb, name):
+        return self.apply_ids(nb, self.get_ids(nb, name))
+
+    def preprocess_task(self, task, resources):
+        compiled_tasks = resources.get("compiled_tasks", dict())
+        with get_metrics().time("GenerateTaskIDs", task=task.relpath):
+            nb = read_notebook(task, resources)
+            if task.relpath in compiled_tasks:
+                self.apply_ids(nb, compiled_tasks[task.relpath].grade_ids)
+            else:
+                name = get_valid_name("_".join([task.pool, task.name]))
+                self.generate_ids(nb, name)
+            write_notebook(task, nb, resources)
+
     def preprocess(self, resources):
-        for task in resources["tasks"]:
-            nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
-            name = get_valid_name("_".join([task.pool, task.name]))
-            self.generate_ids(nb, name)
-            nbformat.write(nb, task.notebook_path)
+        map_tasks(
+            lambda task: self.preprocess_task(task, resources),
+            resources["tasks"],
+            resources,
+        )
         return resources
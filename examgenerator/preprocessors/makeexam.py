@@ -1,22 +1,53 @@
 import base64
 import os
 import pickle
+import threading
 
 import nbformat
 from jupyter_client.kernelspec import KernelSpecManager
 
+from ..backends import get_backend
+from ..utils import read_notebook
+
+
+def _obscure(my_dict):
+    byte_str = pickle.dumps(my_dict)
+    return base64.b85encode(byte_str)
+
+
+_EMPTY_CONFIG = _obscure(dict())
+
 
 class MakeExam:
+    def __init__(self):
+        self._kernelspecs = dict()
+        self._lock = threading.Lock()
+
     def obscure(self, my_dict):
-        byte_str = pickle.dumps(my_dict)
-        return base64.b85encode(byte_str)
+        if not my_dict:
+            return _EMPTY_CONFIG
+        return _obscure(my_dict)
+
+    def get_kernelspec(self, kernel):
+        """
+        Get the kernelspec of a kernel as a dict.
+        Kernelspecs are looked up once and cached until `clear_cache` is called.
+        """
+        with self._lock:
+            if kernel not in self._kernelspecs:
+                self._kernelspecs[kernel] = (
+                    KernelSpecManager().get_kernel_spec(kernel).to_dict()
+                )
+            return self._kernelspecs[kernel]
+
+    def clear_cache(self):
+        with self._lock:
+            self._kernelspecs.clear()
 
     def new_notebook(self, resources):
         nb = nbformat.v4.new_notebook()
         if "kernel" in resources:
-            kernelspec = (
-                KernelSpecManager().get_kernel_spec(resources["kernel"]).to_dict()
-            )
+            kernelspec = self.get_kernelspec(resources["kernel"])
             nb.metadata["kernelspec"] = dict(
                 name=resources["kernel"], display_name=kernelspec["display_name"]
             )
@@ -26,23 +57,32 @@ class MakeExam:
         return nb
 
     def preprocess(self, resources):
+        """
+        Merge the task notebooks into the exam notebook.
+
+        The exam of a student is kept in memory in `resources["exam"]` and its path
+        in `resources["exam_path"]`. It is written by the generator after the
+        solution is forked off and the release copy is sanitized. The source exam is
+        written directly. The path is relative to the output backend.
+        """
         exam = self.new_notebook(resources)
         for task in resources["tasks"]:
-            nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
+            nb = read_notebook(task, resources)
             exam.cells.extend(nb.cells)
-        dst = os.path.join(
-            resources["dst"],
-            "release",
-            resources["exam_name"],
-            f"{resources['student']}",
-            f"{resources['exam_name']}.ipynb",
-        )
         if resources["source"]:
             dst = os.path.join(
-                resources["dst"],
                 "source",
                 resources["exam_name"],
                 f"{resources['exam_name']}.ipynb",
             )
-        nbformat.write(exam, dst)
+            get_backend(resources).write_notebook(exam, dst)
+        else:
+            dst = os.path.join(
+                "release",
+                resources["exam_name"],
+                f"{resources['student']}",
+                f"{resources['exam_name']}.ipynb",
+            )
+        resources["exam"] = exam
+        resources["exam_path"] = dst
         return resources
@@ -1,5 +1,6 @@
 import os
-import shutil
+
+from ..backends import get_backend
 
 
 class MakeSolution:
@@ -7,16 +8,25 @@ class MakeSolution:
         if resources["source"]:
             return resources
         exam_path = os.path.join(
-            resources["dst"],
             "release",
             resources["exam_name"],
             resources["student"],
         )
         solution_path = os.path.join(
-            resources["dst"],
             "solution",
             resources["exam_name"],
             f"{resources['student']}",
         )
-        shutil.copytree(exam_path, solution_path)
+        strategy = resources.get("copy_strategy", "copy")
+        if resources.get("store") is not None:
+            # Share the storage of the deduplicated files
+            strategy = "hardlink"
+        backend = get_backend(resources)
+        backend.copy_tree(exam_path, solution_path, strategy=strategy)
+        if resources.get("exam") is not None:
+            # The exam is not sanitized yet, so it is the solution notebook
+            backend.write_notebook(
+                resources["exam"],
+                os.path.join(solution_path, os.path.basename(resources["exam_path"])),
+            )
         return resources
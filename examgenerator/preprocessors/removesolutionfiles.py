@@ -1,19 +1,20 @@
 import os
-import shutil
+
+from ..backends import get_backend
 
 
 class RemoveSolutionFiles:
     def preprocess(self, resources):
         if resources["source"]:
             return resources
+        backend = get_backend(resources)
         solution_path = os.path.join(
-            resources["dst"],
             "release",
             resources["exam_name"],
             resources["student"],
             "files",
             "solution",
         )
-        if os.path.exists(solution_path):
-            shutil.rmtree(solution_path)
+        if backend.exists(solution_path):
+            backend.remove(solution_path)
         return resources
@@ -1,65 +1,244 @@
+import importlib.machinery
 import importlib.util
 import os
 import re
 import shutil
 import sys
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
 
-import nbformat
+from ..instrumentation import get_metrics
+from ..utils import (
+    TreeHasher,
+    break_link,
+    break_links,
+    map_tasks,
+    read_notebook,
+    write_notebook,
+)
+
+
+class ScramblerLoader(importlib.machinery.SourceFileLoader):
+    """Loader for scramblers that does not write bytecode into the task pool"""
+
+    def set_data(self, path, data, *, _mode=0o666):
+        pass
+
+
+class ScrambleTemplate:
+    """
+    A cell source with scramble variables of the form {{ name }}.
+    The source is parsed once and can then be rendered for many students.
+    """
+
+    pattern = re.compile(r"{{\s*(\w+)\s*}}")
+
+    def __init__(self, source):
+        # Literal text at even and variable names at odd positions
+        self.parts = self.pattern.split(source)
+        self.variables = set(self.parts[1::2])
+
+    def render(self, prefix, replacements=None):
+        """
+        Prefix all variables and substitute the ones in replacements in a single pass.
+        Variables without a replacement are kept as prefixed placeholders.
+
+        Args:
+            prefix (str): The prefix of the variables.
+            replacements (dict, optional): The values of the prefixed variables.
+
+        Returns:
+            str: The rendered source.
+        """
+        if replacements is None:
+            replacements = dict()
+        parts = list(self.parts)
+        for idx in range(1, len(parts), 2):
+            variable = f"{prefix}_{parts[idx]}"
+            if variable in replacements:
+                parts[idx] = str(replacements[variable])
+            else:
+                parts[idx] = "{{" + variable + "}}"
+        return "".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(source):
+    """Get the template of a cell source, reusing it for identical sources"""
+    return ScrambleTemplate(source)
 
 
 class ScrambleTasks:
-    def __init__(self):
-        self.__pattern = re.compile(r"{{\s*(\w+)\s*}}")
+    # Scramblers are imported once per process and reused by all instances. A loaded
+    # scrambler is used by one task at a time, so it may keep state between its calls.
+    # A task that needs a scrambler while all loaded copies are in use loads another.
+    _scramblers = defaultdict(list)
+    _copies = Counter()
+    _scrambler_lock = threading.Lock()
+    _hasher = TreeHasher()
+
+    def render_scramble_variables(self, nb, task, replacements=None, templates=None):
+        """
+        Prefix and replace the scramble variables of all cells in a single pass.
 
-    def __add_prefix(self, prefix, string):
-        return self.__pattern.sub(r"{{{{{}_\1}}}}".format(prefix), string)
+        Args:
+            nb (NotebookNode): The notebook of the task.
+            task (Task): The task.
+            replacements (dict, optional): The values of the prefixed variables.
+                If None, the variables are only prefixed.
+            templates (List[ScrambleTemplate], optional): The precompiled templates of
+                the cells. If None, the templates are compiled from the cells.
 
-    def prefix_scramble_variables(self, nb, task):
+        Returns:
+            Tuple[Set[str], Set[str]]: The prefixed variables without a value and
+                the replacements that are not used by any cell.
+        """
         prefix = "_".join([task.pool, task.name])
-        for cell in nb.cells:
-            cell.source = self.__add_prefix(prefix, cell.source)
-
-    def replace_scramble_variables(self, nb, task, replacements):
-        for cell in nb.cells:
-            for replacement_variable, value in replacements.items():
-                cell.source = cell.source.replace(
-                    "{{" + replacement_variable + "}}", str(value)
-                )
+        if replacements is None:
+            replacements = dict()
+        if templates is None:
+            templates = [compile_template(cell.source) for cell in nb.cells]
+        used = set()
+        for cell, template in zip(nb.cells, templates):
+            if not template.variables:
+                continue
+            cell.source = template.render(prefix, replacements)
+            used.update(f"{prefix}_{variable}" for variable in template.variables)
+        return used - set(replacements), set(replacements) - used
 
-    def load_scrambler_from_task(self, task, name="task_scrambler"):
-        path = os.path.join(task.path, "scramble", "__init__.py")
-        spec = importlib.util.spec_from_file_location(name, path)
+    def load_scrambler(self, path, name):
+        spec = importlib.util.spec_from_file_location(
+            name, path, loader=ScramblerLoader(name, path)
+        )
         module = importlib.util.module_from_spec(spec)
         sys.modules[name] = module
         spec.loader.exec_module(module)
         return module
 
+    @contextmanager
+    def use_scrambler(self, task, resources):
+        """
+        Use the scrambler of a task. Scramblers are loaded from the source task once per
+        process and cached by the content hash of their scramble package. Each copy is
+        registered under a unique module name and returned to the cache when it is no
+        longer used. The package is hashed with the hasher in
+        `resources["tree_hasher"]` if there is one, so the files hashed for the
+        fingerprint of the exam are not read again.
+        """
+        source = resources.get("task_sources", dict()).get(task.relpath, task.path)
+        scramble_path = os.path.join(source, "scramble")
+        with self._scrambler_lock:
+            digest = resources.get("tree_hasher", self._hasher).hash_tree(scramble_path)
+            if self._scramblers[digest]:
+                scrambler = self._scramblers[digest].pop()
+            else:
+                scrambler = self.load_scrambler(
+                    os.path.join(scramble_path, "__init__.py"),
+                    f"task_scrambler_{digest}_{self._copies[digest]}",
+                )
+                self._copies[digest] += 1
+        try:
+            yield scrambler
+        finally:
+            with self._scrambler_lock:
+                # Copies loaded before the cache was cleared are dropped
+                if sys.modules.get(scrambler.__name__) is scrambler:
+                    self._scramblers[digest].append(scrambler)
+
+    @classmethod
+    def clear_cache(cls):
+        """Forget all loaded scramblers"""
+        with cls._scrambler_lock:
+            for digest, copies in cls._copies.items():
+                for copy in range(copies):
+                    sys.modules.pop(f"task_scrambler_{digest}_{copy}", None)
+            cls._scramblers.clear()
+            cls._copies.clear()
+
+    def break_extra_file_links(self, scrambler, task):
+        """
+        Break the links of the files a scrambler writes, so the files it links to are
+        not modified. A scrambler declares the files and directories it writes,
+        relative to the task, in `extra_files`. The links of all files of the task are
+        broken if it does not declare them.
+        """
+        extra_files = getattr(scrambler, "extra_files", None)
+        if extra_files is None:
+            break_links(task.path)
+            return
+        for extra_file in extra_files:
+            path = os.path.join(task.path, extra_file)
+            if os.path.isdir(path) and not os.path.islink(path):
+                break_links(path)
+            else:
+                break_link(path)
+
     def preprocess_task(self, task, resources):
+        """
+        Scramble a single task.
+
+        Returns:
+            dict: The replacements of the task, the report of unknown and unused
+                variables and whether the scrambler created extra files. None if the
+                task is not randomizable.
+        """
         if not task.is_randomizable:
-            return
-        nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
-        self.prefix_scramble_variables(nb, task)
+            return None
+        outcome = dict(replacements=dict(), report=None, modified=False)
+        nb = read_notebook(task, resources)
+        compiled = resources.get("compiled_tasks", dict()).get(task.relpath)
+        templates = compiled.templates if compiled is not None else None
 
-        if not resources["source"]:
-            scrambler = self.load_scrambler_from_task(task)
+        if resources["source"]:
+            self.render_scramble_variables(nb, task, templates=templates)
+        else:
             prefix = "_".join([task.pool, task.name])
+            variables = resources.get("scramble_variables", dict()).get(task.relpath)
+            with self.use_scrambler(task, resources) as scrambler:
+                if variables is None:
+                    with get_metrics().time("scrambler"):
+                        variables = scrambler.replacement_variables(resources["seed"])
+                if hasattr(scrambler, "create_extra_files"):
+                    if (
+                        resources.get("copy_strategy", "copy") != "copy"
+                        or resources.get("workspace") is not None
+                    ):
+                        self.break_extra_file_links(scrambler, task)
+                    with get_metrics().time("scrambler"):
+                        scrambler.create_extra_files(resources["seed"], task.path)
+                    outcome["modified"] = True
             replacements = {
-                f"{prefix}_{name}": value
-                for name, value in scrambler.replacement_variables(
-                    resources["seed"]
-                ).items()
+                f"{prefix}_{name}": value for name, value in variables.items()
             }
 
-            resources["replacements"].update(replacements)
-            self.replace_scramble_variables(nb, task, replacements)
-            if hasattr(scrambler, "create_extra_files"):
-                scrambler.create_extra_files(resources["seed"], task.path)
+            outcome["replacements"] = replacements
+            unknown, unused = self.render_scramble_variables(
+                nb, task, replacements, templates=templates
+            )
+            if unknown or unused:
+                outcome["report"] = dict(unknown=sorted(unknown), unused=sorted(unused))
 
-        nbformat.write(nb, task.notebook_path)
+        write_notebook(task, nb, resources)
         shutil.rmtree(os.path.join(task.path, "scramble"))
+        return outcome
 
     def preprocess(self, resources):
-        for task in resources["tasks"]:
-            self.preprocess_task(task, resources)
+        def process(task):
+            with get_metrics().time("ScrambleTasks", task=task.relpath):
+                return self.preprocess_task(task, resources)
+
+        tasks = resources["tasks"]
+        # Merge the outcomes in the order of the tasks, as if they were processed serially
+        for task, outcome in zip(tasks, map_tasks(process, tasks, resources)):
+            if outcome is None:
+                continue
+            resources["replacements"].update(outcome["replacements"])
+            if outcome["report"] is not None:
+                reports = resources.setdefault("scramble_report", dict())
+                reports[task.relpath] = outcome["report"]
+            if outcome["modified"]:
+                resources.setdefault("modified_tasks", set()).add(task.relpath)
 
         return resources
@@ -1,5 +1,10 @@
+from .analysis import SamplingReport, analyze_samples
+from .cohort import CohortSampler
 from .sampler import TaskSampler
 
 __all__ = [
+    "CohortSampler",
+    "SamplingReport",
     "TaskSampler",
+    "analyze_samples",
 ]
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import combinations
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .sampler import TaskSampler
+
+
+@dataclass
+class SamplingReport:
+    """
+    Class for keeping statistics on a large number of sampled exams.
+
+    Attributes:
+        n_samples (int): The number of sampled exams.
+        points (Dict[int, int]): The number of exams for each total of points.
+        task_frequency (Dict[str, float]): The fraction of exams that contain each task,
+            by task relpath.
+        cooccurrence (Dict[Tuple[str, str], int]): The number of exams that contain
+            both tasks of a pair, by pairs of task relpaths in sorted order.
+        pool_coverage (Dict[str, float]): The fraction of exams that contain at least
+            one task of each pool.
+        tasks_per_pool (Dict[str, Dict[int, int]]): The number of exams for each count
+            of tasks sampled from a pool.
+    """
+
+    n_samples: int = 0
+    points: Dict[int, int] = field(default_factory=dict)
+    task_frequency: Dict[str, float] = field(default_factory=dict)
+    cooccurrence: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    pool_coverage: Dict[str, float] = field(default_factory=dict)
+    tasks_per_pool: Dict[str, Dict[int, int]] = field(default_factory=dict)
+
+    @property
+    def min_points(self) -> Optional[int]:
+        """The lowest total of points, None if no exam was sampled"""
+        return min(self.points) if self.n_samples else None
+
+    @property
+    def max_points(self) -> Optional[int]:
+        """The highest total of points, None if no exam was sampled"""
+        return max(self.points) if self.n_samples else None
+
+    @property
+    def mean_points(self) -> Optional[float]:
+        """The mean total of points, None if no exam was sampled"""
+        if not self.n_samples:
+            return None
+        total = sum(points * count for points, count in self.points.items())
+        return total / self.n_samples
+
+    @property
+    def equal_points(self) -> bool:
+        """True if all sampled exams have the same total of points"""
+        return len(self.points) == 1
+
+    @property
+    def unused_tasks(self) -> List[str]:
+        """The tasks that are in no sampled exam"""
+        return [task for task, freq in self.task_frequency.items() if freq == 0]
+
+    def to_dict(self) -> dict:
+        return dict(
+            n_samples=self.n_samples,
+            points=self.points,
+            task_frequency=self.task_frequency,
+            cooccurrence=[
+                dict(tasks=list(pair), count=count)
+                for pair, count in self.cooccurrence.items()
+            ],
+            pool_coverage=self.pool_coverage,
+            tasks_per_pool=self.tasks_per_pool,
+        )
+
+
+def analyze_samples(
+    sampler: TaskSampler, samples: Iterable[List[int]]
+) -> SamplingReport:
+    """
+    Compute statistics on sampled exams without touching the filesystem.
+
+    Args:
+        sampler (TaskSampler): The sampler the samples were drawn from.
+        samples (Iterable[List[int]]): The indices of the tasks of each sampled exam,
+            see TaskSampler.sample_indices.
+
+    Returns:
+        SamplingReport: The statistics of the samples.
+    """
+    n_samples = 0
+    points = Counter()
+    task_counts = Counter()
+    pair_counts = Counter()
+    pool_counts = Counter()
+    tasks_per_pool = Counter()
+
+    points_of = sampler.points_of.__getitem__
+    pool_of = sampler.pool_of.__getitem__
+    for sample in samples:
+        n_samples += 1
+        indices = sorted(sample)
+        points[sum(map(points_of, indices))] += 1
+        task_counts.update(indices)
+        pair_counts.update(combinations(indices, 2))
+        pools = Counter(map(pool_of, indices))
+        pool_counts.update(pools.keys())
+        tasks_per_pool.update(pools.items())
+    # Exams without a task of a pool are counted once for all samples
+    for pool in sampler.all_pools:
+        if n_samples > pool_counts[pool]:
+            tasks_per_pool[(pool, 0)] += n_samples - pool_counts[pool]
+
+    relpaths = [task.relpath for task in sampler.tasks]
+    pools = sorted(set(sampler.pool_of))
+    return SamplingReport(
+        n_samples=n_samples,
+        points=dict(sorted(points.items())),
+        task_frequency={
+            relpaths[idx]: task_counts[idx] / max(n_samples, 1)
+            for idx in range(len(relpaths))
+        },
+        cooccurrence={
+            tuple(sorted((relpaths[a], relpaths[b]))): count
+            for (a, b), count in pair_counts.most_common()
+        },
+        pool_coverage={pool: pool_counts[pool] / max(n_samples, 1) for pool in pools},
+        tasks_per_pool={
+            pool: {
+                count: n
+                for (name, count), n in sorted(tasks_per_pool.items())
+                if name == pool
+            }
+            for pool in pools
+        },
+    )
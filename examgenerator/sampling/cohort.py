@@ -0,0 +1,201 @@
+import random as rd
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+class CohortSampler:
+    """
+    Assign seeds to the students of a cohort so that neighbouring students get exams
+    with as few tasks in common as possible.
+
+    Each candidate seed is sampled once and its tasks are stored as a bitmask, so the
+    overlap of two exams is a single AND. Seeds are first assigned greedily in the order
+    of the students and then improved by local moves: replacing the seed of a student
+    by an unused candidate, or swapping the seeds of two students. Every seed is used
+    at most once and all exams meet the constraints of the task group, since they are
+    sampled by it.
+
+    Args:
+        tasks: The task group or sampler to sample the tasks of a seed from.
+        n_candidates (int, optional): The number of candidate seeds. If None, the number
+            of students plus 100 is used. Defaults to None.
+        first_seed (int, optional): The first candidate seed. Defaults to 0.
+        rounds (int, optional): The maximum number of rounds of local moves.
+            Defaults to 10.
+        swap_partners (int, optional): The number of students each student tries to
+            swap seeds with per round. Defaults to 16.
+        seed (int, optional): The seed for choosing swap partners. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        tasks,
+        n_candidates: int = None,
+        first_seed: int = 0,
+        rounds: int = 10,
+        swap_partners: int = 16,
+        seed: int = 0,
+    ):
+        self.tasks = tasks
+        self.n_candidates = n_candidates
+        self.first_seed = first_seed
+        self.rounds = rounds
+        self.swap_partners = swap_partners
+        self.seed = seed
+        self.task_bits = dict()
+        self.masks = dict()
+
+    def get_mask(self, seed: int) -> int:
+        """Get the bitmask of the tasks sampled for a seed"""
+        if seed not in self.masks:
+            mask = 0
+            for task in self.tasks.get_tasks(seed=seed):
+                bit = self.task_bits.setdefault(task.relpath, len(self.task_bits))
+                mask |= 1 << bit
+            self.masks[seed] = mask
+        return self.masks[seed]
+
+    def get_neighbours(
+        self,
+        students: Sequence[str],
+        neighbours: Optional[Mapping[str, Iterable[str]]] = None,
+    ) -> Dict[str, List[str]]:
+        """
+        Get the symmetric neighbourhood of each student. Without a seating graph,
+        students next to each other in the given order are neighbours.
+        """
+        graph = {student: set() for student in students}
+        if neighbours is None:
+            for left, right in zip(students, students[1:]):
+                graph[left].add(right)
+                graph[right].add(left)
+        else:
+            for student, adjacent in neighbours.items():
+                for other in adjacent:
+                    if other != student and student in graph and other in graph:
+                        graph[student].add(other)
+                        graph[other].add(student)
+        return {student: sorted(adjacent) for student, adjacent in graph.items()}
+
+    def overlap(self, seed: int, student: str, assignment, graph, exclude=None) -> int:
+        """The number of tasks the exam of a seed shares with the neighbours of a student"""
+        mask = self.get_mask(seed)
+        return sum(
+            popcount(mask & self.get_mask(assignment[other]))
+            for other in graph[student]
+            if other in assignment and other != exclude
+        )
+
+    def cost(
+        self,
+        assignment: Mapping[str, int],
+        neighbours: Optional[Mapping[str, Iterable[str]]] = None,
+    ) -> int:
+        """
+        The total number of shared tasks over all pairs of neighbouring students.
+
+        Args:
+            assignment (Mapping[str, int]): The seed of each student.
+            neighbours (Mapping[str, Iterable[str]], optional): The seating graph.
+                Defaults to the order of the students in `assignment`.
+        """
+        graph = self.get_neighbours(list(assignment), neighbours)
+        return (
+            sum(
+                self.overlap(seed, student, assignment, graph)
+                for student, seed in assignment.items()
+            )
+            // 2
+        )
+
+    def assign(
+        self,
+        students: Sequence[str],
+        neighbours: Optional[Mapping[str, Iterable[str]]] = None,
+    ) -> Dict[str, int]:
+        """
+        Assign a seed to each student.
+
+        Args:
+            students (Sequence[str]): The students, e.g. in the order they are seated.
+            neighbours (Mapping[str, Iterable[str]], optional): The seating graph,
+                mapping each student to the students sitting next to them. If None,
+                students next to each other in `students` are neighbours.
+
+        Returns:
+            Dict[str, int]: The seed of each student, in the order of `students`.
+        """
+        students = list(students)
+        n_candidates = self.n_candidates or len(students) + 100
+        assert n_candidates >= len(students), (
+            f"You want to assign seeds to {len(students)} students"
+            + f" but only allow {n_candidates} candidate seeds."
+        )
+        graph = self.get_neighbours(students, neighbours)
+        free = list(range(self.first_seed, self.first_seed + n_candidates))
+
+        # Greedy assignment in the order of the students
+        assignment = dict()
+        for student in students:
+            best = min(
+                range(len(free)),
+                key=lambda i: self.overlap(free[i], student, assignment, graph),
+            )
+            assignment[student] = free.pop(best)
+
+        random = rd.Random(self.seed)
+        for _ in range(self.rounds):
+            if not self.improve(students, assignment, graph, free, random):
+                break
+        return {student: assignment[student] for student in students}
+
+    def improve(self, students, assignment, graph, free, random) -> bool:
+        """Run one round of local moves and return True if the total cost decreased"""
+        improved = False
+        for student in students:
+            if not graph[student]:
+                continue
+            current = self.overlap(assignment[student], student, assignment, graph)
+            if current == 0:
+                continue
+            # Replace the seed by an unused candidate
+            for i, seed in enumerate(free):
+                cost = self.overlap(seed, student, assignment, graph)
+                if cost < current:
+                    free[i], assignment[student] = assignment[student], seed
+                    current = cost
+                    improved = True
+                    if cost == 0:
+                        break
+            if current == 0:
+                continue
+            # Swap seeds with other students
+            partners = random.sample(students, min(self.swap_partners, len(students)))
+            for other in partners:
+                if other == student:
+                    continue
+                delta = self.swap_delta(student, other, assignment, graph)
+                if delta < 0:
+                    assignment[student], assignment[other] = (
+                        assignment[other],
+                        assignment[student],
+                    )
+                    improved = True
+        return improved
+
+    def swap_delta(self, student, other, assignment, graph) -> int:
+        """
+        The change of the total cost when two students swap their seeds. If they are
+        neighbours, their shared tasks do not change and are left out.
+        """
+        seed, other_seed = assignment[student], assignment[other]
+        before = self.overlap(seed, student, assignment, graph, other) + self.overlap(
+            other_seed, other, assignment, graph, student
+        )
+        after = self.overlap(
+            other_seed, student, assignment, graph, other
+        ) + self.overlap(seed, other, assignment, graph, student)
+        return after - before
@@ -43,3 +43,27 @@ class TasksWithScorePerPoolConstraint(TaskConstraint):
     with a certain score should be sampled from each pool"""
 
     score: int
+
+
+@dataclass
+class GlobalConstraint:
+    """This class represents a constraint on the exam as a whole.
+    Global constraints are met by sampling uniformly from all exams that satisfy them"""
+
+    pass
+
+
+@dataclass
+class TotalPointsConstraint(GlobalConstraint):
+    """This class represents a constraint on the total points of the sampled tasks"""
+
+    points: int
+
+
+@dataclass
+class MaxTasksWithTagConstraint(GlobalConstraint):
+    """This class represents a constraint on how many tasks
+    with a certain tag may be sampled at most"""
+
+    tasks: int
+    tag: str
@@ -0,0 +1,237 @@
+from collections import Counter
+from itertools import combinations
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from .constraints import TaskConstraint
+
+Cell = Tuple[Hashable, int]
+
+
+class FeasibilityChecker:
+    """
+    Decide exactly whether the task constraints can be met by a set of pools.
+
+    The tasks of the pools are summarized by their number per pool and score. After
+    the tasks of the "TasksWithScorePerPool" constraints are taken, the other
+    constraints form a flow network: the source feeds the tasks each constraint needs,
+    every constraint can take tasks from the cells of (pool, score) it accepts, and each
+    cell passes on at most as many tasks as it has. The constraints can be met if the
+    maximum flow takes all tasks they need, i.e. if no cut of the network is smaller
+    than the demand.
+
+    The cuts only depend on the subset A of scores with a "TasksWithScore" demand and
+    the subset of pools they contain. For a fixed A the smallest cut takes, for each
+    pool, the smaller of the tasks the pool has left after its own demand and the tasks
+    it has with a score in A. So the check enumerates the subsets of the demanded
+    scores only, and can take the worst pools for each subset directly instead of
+    enumerating the sets of pools the sampler can draw. Results are cached.
+
+    Args:
+        task_constraints (Dict[str, List[TaskConstraint]]): The task constraints by type.
+    """
+
+    def __init__(self, task_constraints: Dict[str, List[TaskConstraint]]):
+        self.score_per_pool = Counter()
+        for constraint in task_constraints.get("TasksWithScorePerPoolConstraint", []):
+            self.score_per_pool[constraint.score] += constraint.tasks
+        self.score = Counter()
+        for constraint in task_constraints.get("TasksWithScoreConstraint", []):
+            self.score[constraint.score] += constraint.tasks
+        self.tasks_per_pool = sum(
+            constraint.tasks
+            for constraint in task_constraints.get("TasksPerPoolConstraint", [])
+        )
+        self.tasks = sum(
+            constraint.tasks
+            for constraint in task_constraints.get("TasksConstraint", [])
+        )
+        self._cache = dict()
+
+    def sample_size(self, n_pools: int) -> int:
+        """The number of tasks sampled from n_pools pools"""
+        return (
+            sum(self.score_per_pool.values()) * n_pools
+            + sum(self.score.values())
+            + self.tasks_per_pool * n_pools
+            + self.tasks
+        )
+
+    def is_feasible(
+        self,
+        cells: Dict[Cell, int],
+        score: Dict[int, int],
+        pool: Dict[Hashable, int],
+        tasks: int,
+    ) -> bool:
+        """
+        Check if the tasks needed by the constraints can be taken from the cells.
+
+        Args:
+            cells (Dict[Cell, int]): The number of tasks per (pool, score).
+            score (Dict[int, int]): The number of tasks needed with each score.
+            pool (Dict[Hashable, int]): The number of tasks needed from each pool.
+            tasks (int): The number of tasks needed regardless of pool and score.
+
+        Returns:
+            bool: True if all needed tasks can be taken at once.
+        """
+        key = (
+            tuple(sorted(cells.items(), key=repr)),
+            tuple(sorted(score.items())),
+            tuple(sorted(pool.items(), key=repr)),
+            tasks,
+        )
+        if key not in self._cache:
+            per_pool = {pool_name: Counter() for pool_name in pool}
+            for (cell_pool, cell_score), count in cells.items():
+                per_pool.setdefault(cell_pool, Counter())[cell_score] += count
+            self._cache[key] = (
+                self.find_cut(per_pool, score, pool, tasks, len(per_pool)) is None
+            )
+        return self._cache[key]
+
+    def find_cut(
+        self,
+        pools: Dict[Hashable, Counter],
+        score: Dict[int, int],
+        pool: Dict[Hashable, int],
+        tasks: int,
+        n_pools: int,
+    ) -> Optional[str]:
+        """
+        Find a cut that is smaller than the demand for any n_pools of the pools.
+
+        Args:
+            pools (Dict[Hashable, Counter]): The number of tasks per score of each pool.
+            score (Dict[int, int]): The number of tasks needed with each score.
+            pool (Dict[Hashable, int]): The number of tasks needed from each pool.
+            tasks (int): The number of tasks needed regardless of pool and score.
+            n_pools (int): The number of pools that are drawn.
+
+        Returns:
+            Optional[str]: A description of the violated cut or None if the constraints
+                can be met by every n_pools of the pools.
+        """
+        if n_pools > len(pools):
+            return f"only {len(pools)} pools are available"
+        spare = {
+            name: sum(counts.values()) - pool.get(name, 0)
+            for name, counts in pools.items()
+        }
+        if min(spare.values(), default=0) < 0:
+            return "a pool does not have enough tasks"
+        needed = sum(score.values()) + tasks
+        available = sum(sorted(spare.values())[:n_pools])
+        if available < needed:
+            return f"the pools only have {available} of {needed} tasks to spare"
+        demanded = sorted(s for s, count in score.items() if count > 0)
+        for size in range(1, len(demanded) + 1):
+            for subset in combinations(demanded, size):
+                needed = sum(score[s] for s in subset)
+                available = sum(
+                    sorted(
+                        min(spare[name], sum(counts[s] for s in subset))
+                        for name, counts in pools.items()
+                    )[:n_pools]
+                )
+                if available < needed:
+                    return (
+                        f"the pools only have {available} of {needed} tasks"
+                        f" with a score in {list(subset)} to spare"
+                    )
+        return None
+
+    def check_pools(
+        self, pools: Dict[Hashable, Counter], n_pools: int
+    ) -> Optional[str]:
+        """
+        Check if all constraints can be met by every n_pools of the pools.
+
+        Args:
+            pools (Dict[Hashable, Counter]): The number of tasks per score of each pool.
+            n_pools (int): The number of pools that are drawn.
+
+        Returns:
+            Optional[str]: A description of why the constraints can not be met or None.
+        """
+        remaining = dict()
+        for name, counts in pools.items():
+            remaining[name] = Counter(counts)
+            for score, tasks in self.score_per_pool.items():
+                if counts[score] < tasks:
+                    return (
+                        f"pool {name} has less than {tasks} tasks worth {score} points"
+                    )
+                remaining[name][score] -= tasks
+        return self.find_cut(
+            remaining,
+            dict(self.score),
+            {name: self.tasks_per_pool for name in pools},
+            self.tasks,
+            n_pools,
+        )
+
+    def sample(
+        self, scores: Dict[int, Dict[Hashable, List[int]]], pools: List, random
+    ) -> List[int]:
+        """
+        Sample tasks that meet all constraints by picking them one at a time. A task is
+        only picked if the constraints can still be met afterwards, so this never fails
+        for a set of pools that passes `check_pools`.
+
+        Args:
+            scores (Dict[int, Dict[Hashable, List[int]]]): The task indices by score and
+                pool.
+            pools (List): The pools to sample from.
+            random (random.Random): The random number generator.
+
+        Returns:
+            List[int]: The indices of the sampled tasks.
+        """
+        cells = dict()
+        for score in sorted(scores):
+            for pool in pools:
+                indices = list(scores[score].get(pool, []))
+                random.shuffle(indices)
+                cells[(pool, score)] = indices
+        counts = {cell: len(indices) for cell, indices in cells.items()}
+
+        sample = []
+        for score in sorted(self.score_per_pool):
+            for pool in pools:
+                for _ in range(self.score_per_pool[score]):
+                    sample.append(cells[(pool, score)].pop())
+                    counts[(pool, score)] -= 1
+
+        needed_score = dict(self.score)
+        needed_pool = {pool: self.tasks_per_pool for pool in pools}
+        needed = dict(tasks=self.tasks)
+        units = []
+        for score in sorted(self.score):
+            units.extend([("score", score)] * self.score[score])
+        for pool in pools:
+            units.extend([("pool", pool)] * self.tasks_per_pool)
+        units.extend([("tasks", None)] * self.tasks)
+
+        for kind, value in units:
+            if kind == "score":
+                needed_score[value] -= 1
+                eligible = [cell for cell in cells if cell[1] == value]
+            elif kind == "pool":
+                needed_pool[value] -= 1
+                eligible = [cell for cell in cells if cell[0] == value]
+            else:
+                needed["tasks"] -= 1
+                eligible = list(cells)
+            random.shuffle(eligible)
+            for cell in eligible:
+                if counts[cell] <= 0:
+                    continue
+                counts[cell] -= 1
+                if self.is_feasible(counts, needed_score, needed_pool, needed["tasks"]):
+                    sample.append(cells[cell].pop())
+                    break
+                counts[cell] += 1
+            else:
+                raise ValueError("The constraints can not be met by the given pools")
+        return sample
@@ -1,14 +1,63 @@
+from __future__ import annotations
+
 import random as rd
 from collections import defaultdict
-from copy import deepcopy
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Set
+
+from .analysis import SamplingReport, analyze_samples
+from .constraints import GlobalConstraint, PoolConstraint, TaskConstraint
+from .uniform import UniformSampler
+from .validator import ConstraintValidator
 
-import nbformat
-from e2xgrader.utils.nbgrader_cells import get_points
+if TYPE_CHECKING:
+    from ..tasks import Task, TaskIndex
 
-from ..tasks import Task
-from .constraints import PoolConstraint, TaskConstraint
-from .validator import ConstraintValidator
+
+def _sample_seeds(sampler: TaskSampler, seeds: range) -> List[List[int]]:
+    return sampler.sample_batch(seeds)
+
+
+class ShuffledCell:
+    """
+    The task indices of a score and pool in random order. The order is drawn lazily
+    from the end of the list, so a draw only pays for the tasks it looks at. The
+    indices in `items[:unshuffled]` are not shuffled yet.
+    """
+
+    __slots__ = ("items", "unshuffled", "random_gen")
+
+    def __init__(self, indices: Iterable[int], random_gen: rd.Random):
+        self.items = list(indices)
+        self.unshuffled = len(self.items)
+        self.random_gen = random_gen
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def last(self, n: int) -> List[int]:
+        """Get the last n indices, shuffling the cell up to them"""
+        items = self.items
+        start = max(len(items) - n, 0)
+        while self.unshuffled > start:
+            end = self.unshuffled - 1
+            if end > 0:
+                idx = self.random_gen.randrange(self.unshuffled)
+                items[idx], items[end] = items[end], items[idx]
+            self.unshuffled = end
+        return items[start:]
+
+    def take(self, n: int) -> List[int]:
+        """Remove and return the last n indices"""
+        sample = self.last(n)
+        del self.items[len(self.items) - len(sample) :]
+        return sample
+
+    def remove(self, indices: Set[int]) -> None:
+        """Remove indices that were returned by `last`"""
+        self.items = [idx for idx in self.items if idx not in indices]
 
 
 class TaskSampler:
@@ -18,10 +67,14 @@ class TaskSampler:
     Args:
         tasks (List[Task]): A list of tasks to sample from.
         task_constraints (List[TaskConstraint]): A list of constraints that must be satisfied
-                                                 for each task.
+                                                 for each task. Global constraints like
+                                                 TotalPointsConstraint are met by sampling
+                                                 uniformly from all valid exams.
         pool_constraint (PoolConstraint, optional): A constraint on the pools to sample from.
                                                     Defaults to None.
         permute (bool, optional): Whether to permute the list of sampled tasks. Defaults to False.
+        index (TaskIndex, optional): An index of task metadata used to look up the points
+                                     of the tasks. Defaults to an in-memory index.
     """
 
     def __init__(
@@ -30,7 +83,14 @@ class TaskSampler:
         task_constraints: List[TaskConstraint],
         pool_constraint: PoolConstraint = None,
         permute: bool = False,
+        index: TaskIndex = None,
     ):
+        if index is None:
+            # Imported here to avoid a circular import with the tasks package
+            from ..tasks import TaskIndex
+
+            index = TaskIndex()
+        self.index = index
         self.random_gen = rd.Random()
         self.permute = permute
         self.tasks = tasks
@@ -46,18 +106,29 @@ class TaskSampler:
         tasks_per_pool = self.task_constraints["TasksPerPoolConstraint"]
         self.tasks_per_pool = tasks_per_pool[0].tasks if tasks_per_pool else 0
 
+        # Without score constraints the tasks are sampled per pool directly
+        self.by_pool = not (
+            self.task_constraints["TasksWithScoreConstraint"]
+            or self.task_constraints["TasksWithScorePerPoolConstraint"]
+        )
+
+        self.uniform = None
+        if any(isinstance(c, GlobalConstraint) for c in task_constraints):
+            self.uniform = UniformSampler(self)
+            assert self.uniform.n_exams() > 0, "No exam meets all of your constraints."
+
     def calculate_points(self) -> None:
         """
         Calculates the score for each task based on the points assigned to each cell
-        in the task's notebook.
+        in the task's notebook. The points are looked up in the task index.
         """
-        self.score_per_pool = defaultdict(lambda: defaultdict(list))
+        self.score_per_pool = defaultdict(partial(defaultdict, list))
         for task in self.tasks:
             if task.points < 0:
-                assert task.notebook_exists, f"No notebook found for task {task}"
-                nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
-                task.points = sum([get_points(cell) for cell in nb.cells])
+                task.points = self.index.get(task).points
             self.score_per_pool[task.pool][task.points].append(task)
+        self.index.save()
+        self.build_task_table()
 
     def parse_task_constraints(
         self, task_constraints: List[TaskConstraint]
@@ -77,128 +148,185 @@ class TaskSampler:
             constraints[type(constraint).__name__].append(constraint)
         return constraints
 
-    def get_score_dict(
-        self, pools: List[str], tasks: List[Task]
-    ) -> Dict[str, Dict[str, List[Task]]]:
+    def build_task_table(self) -> None:
+        """
+        Build the immutable table the sampler works on. Tasks are referred to by their
+        index in `self.tasks`, the pool and points of each task are stored in tuples.
         """
-        Returns a dictionary of task scores by pool.
+        self.pool_of = tuple(task.pool for task in self.tasks)
+        self.points_of = tuple(task.points for task in self.tasks)
+        self.all_pools = sorted(set(self.pool_of))
+        # The first index and the indices of each score and pool. The first indices
+        # give the order in which get_score_dict visits the scores and pools.
+        self.cells_of_pool = defaultdict(dict)
+        self.firsts_of_score = defaultdict(list)
+        for score, score_pools in self.get_score_dict(self.all_pools).items():
+            for pool, indices in score_pools.items():
+                self.cells_of_pool[pool][score] = (indices[0], tuple(indices))
+                self.firsts_of_score[score].append((indices[0], pool))
+
+    def get_score_dict(self, pools: List[str]) -> Dict[int, Dict[str, List[int]]]:
+        """
+        Returns a dictionary of task indices by score and pool, in the order of the tasks.
 
         Args:
             pools (List[str]): A list of pool names to include in the score dictionary.
-            tasks (List[Task]): A list of tasks to include in the score dictionary.
 
         Returns:
-            Dict[str, Dict[str, List[Task]]]: A dictionary of task scores by pool.
-        """
-        scores = defaultdict(lambda: defaultdict(list))
-        for task in tasks:
-            if task.pool in pools:
-                scores[task.points][task.pool].append(task)
-        for score in scores:
-            for pool in scores[score]:
-                self.random_gen.shuffle(scores[score][pool])
+            Dict[int, Dict[str, List[int]]]: A dictionary of task indices by score and pool.
+        """
+        pools = set(pools)
+        scores = defaultdict(partial(defaultdict, list))
+        for idx, (pool, points) in enumerate(zip(self.pool_of, self.points_of)):
+            if pool in pools:
+                scores[points][pool].append(idx)
         return scores
 
-    def sample_pools(self, tasks: List[Task]) -> List[str]:
+    def shuffle_score_dict(
+        self, pools: List[str]
+    ) -> Dict[int, Dict[str, ShuffledCell]]:
         """
-        Sample a list of pools based on the given pool constraint, if any.
-        Otherwise, return all available pools.
+        Returns a shuffled copy of the dictionary of task indices by score and pool.
+        The cells are shuffled lazily, when the sampler takes tasks from them.
 
         Args:
-            tasks (List[Task]): The list of tasks to sample pools from.
+            pools (List[str]): A list of pool names to include in the score dictionary.
+
+        Returns:
+            Dict[int, Dict[str, ShuffledCell]]: A dictionary of task indices by score
+                and pool. Missing cells are created empty.
+        """
+        random_gen = self.random_gen
+        cells = sorted(
+            (first, score, indices)
+            for pool in pools
+            for score, (first, indices) in self.cells_of_pool[pool].items()
+        )
+        scores = defaultdict(partial(defaultdict, lambda: ShuffledCell((), random_gen)))
+        for _, score, indices in cells:
+            scores[score][self.pool_of[indices[0]]] = ShuffledCell(indices, random_gen)
+        return scores
+
+    def sample_pools(self) -> List[str]:
+        """
+        Sample a list of pools based on the given pool constraint, if any.
+        Otherwise, return all available pools.
 
         Returns:
             List[str]: The list of pools to sample tasks from.
         """
-        pools = list(set([task.pool for task in tasks]))
+        pools = list(self.all_pools)
         if self.pool_constraint is not None:
             pools = self.random_gen.sample(pools, self.pool_constraint.pools)
         return pools
 
     def sample_tasks_with_score_per_pool(
-        self, scores: Dict[int, Dict[int, List[Task]]], pools: List[int]
-    ) -> List[Task]:
+        self, scores: Dict[int, Dict[str, ShuffledCell]], pools: List[str]
+    ) -> List[int]:
         """
         Sample a list of tasks based on the "TasksWithScorePerPool" constraints.
         For each constraint sample n_tasks with a certain score from each pool.
 
         Args:
-            scores (Dict[int, Dict[int, List[Task]]]): A dictionary of scores for each pool.
-            pools (List[int]): The list of pools to sample tasks from.
+            scores (Dict[int, Dict[str, ShuffledCell]]): A dictionary of task indices
+                for each score and pool.
+            pools (List[str]): The list of pools to sample tasks from.
 
         Returns:
-            List[Task]: The list of sampled tasks.
+            List[int]: The indices of the sampled tasks.
         """
         sample = []
         for constraint in self.task_constraints["TasksWithScorePerPoolConstraint"]:
             for pool in pools:
-                sample.extend(scores[constraint.score][pool][-constraint.tasks :])
-                del scores[constraint.score][pool][-constraint.tasks :]
+                sample.extend(scores[constraint.score][pool].take(constraint.tasks))
         return sample
 
     def sample_tasks_with_score(
-        self, scores: Dict[int, Dict[int, List[Task]]], pools: List[int]
-    ) -> List[Task]:
+        self, scores: Dict[int, Dict[str, ShuffledCell]], pools: List[str]
+    ) -> List[int]:
         """
         Sample a list of tasks based on the "TasksWithScore" constraints.
         For each constraint sample n_tasks with a certain score from all tasks.
 
         Args:
-            scores (Dict[int, Dict[int, List[Task]]]): A dictionary of scores for each pool.
-            pools (List[int]): The list of pools to sample tasks from.
+            scores (Dict[int, Dict[str, ShuffledCell]]): A dictionary of task indices
+                for each score and pool.
+            pools (List[str]): The list of pools to sample tasks from.
 
         Returns:
-            List[Task]: The list of sampled tasks.
+            List[int]: The indices of the sampled tasks.
         """
+
+        def candidates(cell, pool):
+            # The tasks of candidate[-(pool_size - tasks_per_pool):] of the cell
+            n = pool_size[pool] - self.tasks_per_pool
+            if n <= 0:
+                n = len(cell) + n if n < 0 else len(cell)
+            return cell.last(n)
+
         sample = []
         pool_size = {
             pool: sum([len(scores[score][pool]) for score in scores]) for pool in pools
         }
         for constraint in self.task_constraints["TasksWithScoreConstraint"]:
-            candidates = [
-                x
-                for pool, candidate in scores[constraint.score].items()
-                for x in candidate[-(pool_size[pool] - self.tasks_per_pool) :]
-            ]
-            new_sample = self.random_gen.sample(candidates, constraint.tasks)
+            cells = scores[constraint.score]
+            new_sample = self.random_gen.sample(
+                [x for pool, cell in cells.items() for x in candidates(cell, pool)],
+                constraint.tasks,
+            )
             sample.extend(new_sample)
-            # Remove sample
-            for task in new_sample:
-                scores[task.points][task.pool].remove(task)
-                pool_size[task.pool] -= 1
+            # Remove sample, all sampled tasks have the score of the constraint
+            sampled = set(new_sample)
+            for pool in {self.pool_of[idx] for idx in new_sample}:
+                cells[pool].remove(sampled)
+            for idx in new_sample:
+                pool_size[self.pool_of[idx]] -= 1
         return sample
 
     def sample_tasks_without_score(
-        self, scores: Dict[int, Dict[int, List[Task]]], pools: List[int]
-    ) -> List[Task]:
+        self, scores: Dict[int, Dict[str, ShuffledCell]], pools: List[str]
+    ) -> List[int]:
         """
         Sample a list of based on the "TasksPerPoolConstraint" and the "TasksConstraint".
         This will sample tasks regardless of the score of a task.
 
 
         Args:
-            scores (Dict[int, Dict[int, List[Task]]]): A dictionary of scores for each pool.
-            pools (List[int]): The list of pools to sample tasks from.
+            scores (Dict[int, Dict[str, ShuffledCell]]): A dictionary of task indices
+                for each score and pool.
+            pools (List[str]): The list of pools to sample tasks from.
 
         Returns:
-            List[Task]: The list of sampled tasks.
+            List[int]: The indices of the sampled tasks.
         """
         sample = []
         pool_dict = defaultdict(list)
         for score, pools in scores.items():
-            for pool, tasks in pools.items():
-                pool_dict[pool].extend(tasks)
+            for pool, cell in pools.items():
+                pool_dict[pool].append(cell)
 
         if self.tasks_per_pool > 0:
-            for pool, tasks in pool_dict.items():
-                # Get the last N tasks based on the `tasks_per_pool` constraint
-                sample.extend(tasks[-self.tasks_per_pool :])
-                del tasks[-self.tasks_per_pool :]
-
-        # Flatten the list of remaining tasks
-        rest = [task for pool_tasks in pool_dict.values() for task in pool_tasks]
+            for pool, cells in pool_dict.items():
+                # Get the last N tasks of the pool based on the `tasks_per_pool`
+                # constraint, taking them from the cells at the end first
+                needed = self.tasks_per_pool
+                taken = []
+                for cell in reversed(cells):
+                    taken.append(cell.take(needed))
+                    needed -= len(taken[-1])
+                    if needed == 0:
+                        break
+                sample.extend(idx for part in reversed(taken) for idx in part)
 
         if len(self.task_constraints["TasksConstraint"]) > 0:
+            # random.sample draws uniformly from all positions, so the remaining
+            # tasks do not need to be shuffled
+            rest = [
+                idx
+                for cells in pool_dict.values()
+                for cell in cells
+                for idx in cell.items
+            ]
             sample.extend(
                 self.random_gen.sample(
                     rest, self.task_constraints["TasksConstraint"][0].tasks
@@ -206,6 +334,196 @@ class TaskSampler:
             )
         return sample
 
+    def sample_tasks_by_pool(self, pools: List[str]) -> List[int]:
+        """
+        Sample a list of tasks based on the "TasksPerPoolConstraint" and the
+        "TasksConstraint" without building the shuffled score dictionary. The samples
+        are drawn from the same distribution and in the same order as in
+        `sample_tasks_without_score`, but only the sampled tasks are drawn.
+
+        Args:
+            pools (List[str]): The list of pools to sample tasks from.
+
+        Returns:
+            List[int]: The indices of the sampled tasks.
+        """
+        # The scores are visited in the order of their first task in the pools
+        chosen = set(pools)
+        first_of_score = dict()
+        for score, firsts in self.firsts_of_score.items():
+            for first, pool in firsts:
+                if pool in chosen:
+                    first_of_score[score] = first
+                    break
+        rank = first_of_score.__getitem__
+
+        # The pools are visited in the order of the first task of their first score
+        ordered = []
+        for pool in pools:
+            cells = self.cells_of_pool[pool]
+            score = min(cells, key=rank)
+            ordered.append((rank(score), cells[score][0], pool))
+        ordered.sort()
+
+        sample = []
+        for _, _, pool in ordered:
+            # The last N tasks of the pool are taken from the cells of the last
+            # scores first
+            needed = self.tasks_per_pool
+            if needed == 0:
+                continue
+            cells = self.cells_of_pool[pool]
+            if needed == 1:
+                indices = cells[max(cells, key=rank)][1]
+                sample.append(self.random_gen.choice(indices))
+                continue
+            taken = []
+            for score in sorted(cells, key=rank, reverse=True):
+                indices = cells[score][1]
+                taken.append(self.sample_distinct(indices, min(needed, len(indices))))
+                needed -= len(taken[-1])
+                if needed == 0:
+                    break
+            sample.extend(idx for part in reversed(taken) for idx in part)
+
+        if len(self.task_constraints["TasksConstraint"]) > 0:
+            sample.extend(
+                self.sample_distinct(
+                    [
+                        idx
+                        for pool in pools
+                        for _, indices in self.cells_of_pool[pool].values()
+                        for idx in indices
+                    ],
+                    self.task_constraints["TasksConstraint"][0].tasks,
+                    excluded=set(sample),
+                )
+            )
+        return sample
+
+    def sample_distinct(
+        self, population: Sequence[int], k: int, excluded: Set[int] = frozenset()
+    ) -> List[int]:
+        """
+        Sample k distinct elements of a population that are not excluded. The sample
+        is drawn from the same distribution as `random.sample` on the remaining
+        elements. Small samples are drawn by rejection, which is cheaper than
+        building the remaining population.
+
+        Args:
+            population (Sequence[int]): The distinct elements to sample from.
+            k (int): The size of the sample.
+            excluded (Set[int], optional): Elements of the population that must not
+                be sampled. Defaults to an empty set.
+
+        Returns:
+            List[int]: The sampled elements.
+        """
+        if 4 * k > len(population) - len(excluded):
+            if excluded:
+                population = [x for x in population if x not in excluded]
+            return self.random_gen.sample(population, k)
+        sample = []
+        while len(sample) < k:
+            x = self.random_gen.choice(population)
+            if x not in excluded and x not in sample:
+                sample.append(x)
+        return sample
+
+    def draw(self) -> List[int]:
+        """Sample the indices of the tasks of one exam with `self.random_gen`"""
+        if self.uniform is not None:
+            sample = self.uniform.sample(self.random_gen)
+            if self.permute:
+                self.random_gen.shuffle(sample)
+            return sample
+
+        pools = self.sample_pools()
+        try:
+            if self.by_pool:
+                sample = self.sample_tasks_by_pool(pools)
+            else:
+                scores = self.shuffle_score_dict(pools)
+                sample = self.sample_tasks_with_score_per_pool(scores, pools)
+                sample.extend(self.sample_tasks_with_score(scores, pools))
+                sample.extend(self.sample_tasks_without_score(scores, pools))
+        except ValueError:
+            sample = None
+        if sample is None or len(sample) != self.validator.checker.sample_size(
+            len(pools)
+        ):
+            # The fast path ran out of tasks, pick them one at a time instead
+            sample = self.validator.checker.sample(
+                self.get_score_dict(pools), pools, self.random_gen
+            )
+
+        if self.permute:
+            self.random_gen.shuffle(sample)
+        return sample
+
+    def sample_indices(self, seed: int = None) -> List[int]:
+        """
+        Sample the indices of the tasks according to the given constraints.
+        Nothing is copied, so this is cheap enough to draw many samples.
+
+        Args:
+            seed (int, optional): The seed to use for the random number generator. If None,
+                the current system time is used. Defaults to None.
+
+        Returns:
+            List[int]: The indices of the sampled tasks in `self.tasks`.
+        """
+        self.random_gen = rd.Random(seed)
+        return self.draw()
+
+    def sample_batch(self, seeds: Iterable[int]) -> List[List[int]]:
+        """
+        Sample the indices of the tasks for many seeds. Each sample is the same as
+        `sample_indices(seed)`, but one random number generator is reseeded for all.
+
+        Args:
+            seeds (Iterable[int]): The seeds to sample.
+
+        Returns:
+            List[List[int]]: The indices of the sampled tasks for each seed.
+        """
+        self.random_gen = rd.Random()
+        samples = []
+        for seed in seeds:
+            self.random_gen.seed(seed)
+            samples.append(self.draw())
+        return samples
+
+    def simulate(
+        self, n_seeds: int = 10000, first_seed: int = 0, workers: int = None
+    ) -> SamplingReport:
+        """
+        Sample the exams of many seeds and report statistics on them, e.g. to check that
+        every student gets the same total of points before an exam is released.
+
+        Args:
+            n_seeds (int, optional): The number of seeds to sample. Defaults to 10000.
+            first_seed (int, optional): The first seed, the seeds
+                `first_seed, ..., first_seed + n_seeds - 1` are sampled. Defaults to 0.
+            workers (int, optional): The number of worker processes to sample batches
+                of seeds in. If None or 1, all seeds are sampled in this process.
+                Defaults to None.
+
+        Returns:
+            SamplingReport: The point totals, task frequencies, pairwise co-occurrences
+                and pool coverage of the sampled exams.
+        """
+        seeds = range(first_seed, first_seed + n_seeds)
+        if workers is None or workers <= 1:
+            return analyze_samples(self, self.sample_batch(seeds))
+        batch_size = -(-n_seeds // workers)
+        batches = [seeds[i : i + batch_size] for i in range(0, n_seeds, batch_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_sample_seeds, [self] * len(batches), batches)
+            return analyze_samples(
+                self, (sample for batch in results for sample in batch)
+            )
+
     def get_tasks(self, seed: int = None, source: bool = False) -> List[Task]:
         """
         Sample the tasks according to the given constraints.
@@ -219,19 +537,6 @@ class TaskSampler:
         Returns:
             List[Task]: The sampled tasks
         """
-        self.random_gen = rd.Random(seed)
-        tasks = [deepcopy(task) for task in self.tasks]
-
         if source:
-            return tasks
-
-        pools = self.sample_pools(tasks)
-        scores = self.get_score_dict(pools, tasks)
-
-        sample = self.sample_tasks_with_score_per_pool(scores, pools)
-        sample.extend(self.sample_tasks_with_score(scores, pools))
-        sample.extend(self.sample_tasks_without_score(scores, pools))
-
-        if self.permute:
-            self.random_gen.shuffle(sample)
-        return sample
+            return [copy(task) for task in self.tasks]
+        return [copy(self.tasks[idx]) for idx in self.sample_indices(seed)]
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+from operator import add, le, sub
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from .constraints import MaxTasksWithTagConstraint, TotalPointsConstraint
+
+if TYPE_CHECKING:
+    from .sampler import TaskSampler
+
+# The number of tasks, the points and the number of tasks with each tag of a set of tasks
+Summary = Tuple[int, ...]
+
+
+class UniformSampler:
+    """
+    Sample uniformly from all exams that meet the constraints of a TaskSampler,
+    including global constraints like the total points of an exam.
+
+    An exam is a set of pools and a set of tasks from these pools. Each drawn pool
+    contributes at least the tasks of the "TasksPerPoolConstraint", and the exam has
+    the tasks of all pools plus the tasks of the "TasksConstraint". The number of exams
+    is counted with a dynamic program over the pools, where each pool contributes a
+    number of tasks, points and tagged tasks. Exams are then drawn backwards through
+    the counts, first the contribution of each pool and then the tasks within the pool,
+    so every exam has the same probability and no sample is ever rejected.
+
+    The counts are exact integers. They are computed once per sampler and reused for
+    every seed.
+
+    Args:
+        sampler (TaskSampler): The sampler with the tasks and constraints.
+
+    Raises:
+        ValueError: If the constraints can not be sampled uniformly, e.g. because they
+            contain constraints on the score of tasks.
+    """
+
+    def __init__(self, sampler: TaskSampler):
+        constraints = sampler.task_constraints
+        for name in ["TasksWithScoreConstraint", "TasksWithScorePerPoolConstraint"]:
+            if constraints[name]:
+                raise ValueError(
+                    f"{name} can not be combined with global constraints,"
+                    + " use TotalPointsConstraint instead"
+                )
+        totals = {c.points for c in constraints[TotalPointsConstraint.__name__]}
+        if len(totals) > 1:
+            raise ValueError(f"Conflicting total points {sorted(totals)}")
+        self.total_points = totals.pop() if totals else None
+        if self.total_points is not None and min(sampler.points_of, default=0) < 0:
+            raise ValueError("Total points can only be sampled for positive points")
+
+        max_tagged = dict()
+        for constraint in constraints[MaxTasksWithTagConstraint.__name__]:
+            max_tagged[constraint.tag] = min(
+                constraint.tasks, max_tagged.get(constraint.tag, constraint.tasks)
+            )
+        self.tags = list(max_tagged)
+
+        self.pools = sorted(set(sampler.pool_of))
+        self.draw_all_pools = sampler.pool_constraint is None
+        self.n_pools = len(self.pools)
+        if not self.draw_all_pools:
+            self.n_pools = sampler.pool_constraint.pools
+        self.tasks_per_pool = sampler.tasks_per_pool
+        extra = sampler.task_constraints["TasksConstraint"]
+        extra = extra[0].tasks if extra else 0
+        self.n_tasks = self.tasks_per_pool * self.n_pools + extra
+        # A pool gets the extra tasks at most on top of its own
+        self.max_per_pool = self.tasks_per_pool + extra
+        self.limits = (
+            self.n_tasks,
+            self.total_points if self.total_points is not None else float("inf"),
+            *max_tagged.values(),
+        )
+        self.empty = tuple(0 for _ in self.limits)
+
+        self.pool_tasks = defaultdict(list)
+        for idx, pool in enumerate(sampler.pool_of):
+            self.pool_tasks[pool].append(idx)
+        self.summaries = [
+            self.summarize(sampler, idx) for idx in range(len(sampler.pool_of))
+        ]
+        self.subsets = [
+            self.count_subsets(self.pool_tasks[pool]) for pool in self.pools
+        ]
+        self.contributions = [
+            [
+                (contribution, ways)
+                for contribution, ways in sorted(tables[0].items())
+                if contribution[0] >= self.tasks_per_pool
+            ]
+            for tables in self.subsets
+        ]
+        self._counts = dict()
+        self._options = dict()
+
+    def summarize(self, sampler: TaskSampler, idx: int) -> Summary:
+        tags = sampler.tasks[idx].tags
+        return (
+            1,
+            sampler.points_of[idx] if self.total_points is not None else 0,
+            *(int(tag in tags) for tag in self.tags),
+        )
+
+    def is_valid(self, summary: Summary) -> bool:
+        """Check if a partial exam is within the limits of the constraints"""
+        return all(map(le, summary, self.limits))
+
+    def count_subsets(self, indices: List[int]) -> List[Dict[Summary, int]]:
+        """
+        Count the subsets of the tasks of a pool by their summary. The i-th table counts
+        the subsets of the tasks from position i on.
+        """
+        tables = [{self.empty: 1}]
+        for idx in reversed(indices):
+            table = dict(tables[0])
+            for summary, count in tables[0].items():
+                new = tuple(map(add, summary, self.summaries[idx]))
+                if new[0] <= self.max_per_pool and self.is_valid(new):
+                    table[new] = table.get(new, 0) + count
+            tables.insert(0, table)
+        return tables
+
+    def count(self, i: int, drawn: int, summary: Summary) -> int:
+        """Count the completions of a partial exam with the pools from position i on"""
+        key = (i, drawn, summary)
+        if key not in self._counts:
+            if i == len(self.pools):
+                self._counts[key] = int(
+                    drawn == self.n_pools
+                    and summary[0] == self.n_tasks
+                    and (self.total_points is None or summary[1] == self.total_points)
+                )
+            else:
+                self._counts[key] = self.get_options(i, drawn, summary)[1][-1]
+        return self._counts[key]
+
+    def get_options(self, i: int, drawn: int, summary: Summary):
+        """
+        Get the states after the pool at position i that can lead to a valid exam,
+        and the cumulative number of completions through them.
+        """
+        key = (i, drawn, summary)
+        if key in self._options:
+            return self._options[key]
+        options = []
+        weights = []
+        remaining = len(self.pools) - i - 1
+        if not self.draw_all_pools and drawn + remaining >= self.n_pools:
+            options.append((drawn, summary, None))
+            weights.append(self.count(i + 1, drawn, summary))
+        if drawn < self.n_pools:
+            # The tasks the other pools to draw need at least
+            reserved = self.tasks_per_pool * (self.n_pools - drawn - 1)
+            for contribution, ways in self.contributions[i]:
+                if summary[0] + contribution[0] + reserved > self.n_tasks:
+                    # The contributions are sorted by their number of tasks
+                    break
+                new = tuple(map(add, summary, contribution))
+                if self.is_valid(new):
+                    completions = self.count(i + 1, drawn + 1, new)
+                    if completions:
+                        options.append((drawn + 1, new, contribution))
+                        weights.append(ways * completions)
+        result = (options, list(accumulate(weights, initial=0)))
+        self._options[key] = result
+        return result
+
+    def n_exams(self) -> int:
+        """The number of distinct exams that meet all constraints"""
+        return self.count(0, 0, self.empty)
+
+    def sample(self, random) -> List[int]:
+        """
+        Draw an exam uniformly from all exams that meet the constraints.
+
+        Args:
+            random (random.Random): The random number generator.
+
+        Returns:
+            List[int]: The indices of the sampled tasks, grouped by pool.
+        """
+        if self.n_exams() == 0:
+            raise ValueError("No exam meets all constraints")
+        drawn, summary = 0, self.empty
+        sample = []
+        for i in range(len(self.pools)):
+            options, weights = self.get_options(i, drawn, summary)
+            pick = random.randrange(weights[-1])
+            drawn, summary, contribution = options[bisect_right(weights, pick) - 1]
+            if contribution is not None:
+                sample.extend(self.sample_subset(i, contribution, random))
+        return sample
+
+    def sample_subset(self, i: int, summary: Summary, random) -> List[int]:
+        """Draw a subset of the tasks of the pool at position i with a given summary"""
+        tables = self.subsets[i]
+        subset = []
+        for j, idx in enumerate(self.pool_tasks[self.pools[i]]):
+            if summary == self.empty:
+                break
+            rest = tuple(map(sub, summary, self.summaries[idx]))
+            with_task = tables[j + 1].get(rest, 0)
+            if with_task and random.randrange(tables[j][summary]) < with_task:
+                subset.append(idx)
+                summary = rest
+        return subset
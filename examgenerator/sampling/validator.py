@@ -1,8 +1,13 @@
-from collections import defaultdict
-from typing import Dict, List
+from __future__ import annotations
 
-from ..tasks import Task
-from .constraints import PoolConstraint, TaskConstraint
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, List
+
+from .constraints import GlobalConstraint, PoolConstraint, TaskConstraint
+from .feasibility import FeasibilityChecker
+
+if TYPE_CHECKING:
+    from ..tasks import Task
 
 
 class ConstraintValidator:
@@ -19,6 +24,15 @@ class ConstraintValidator:
         self.pools = defaultdict(list)
         for task in self.tasks:
             self.pools[task.pool].append(task)
+        self.checker = FeasibilityChecker(task_constraints)
+
+    @property
+    def has_global_constraints(self) -> bool:
+        return any(
+            isinstance(constraint, GlobalConstraint)
+            for constraints in self.task_constraints.values()
+            for constraint in constraints
+        )
 
     @property
     def tasks_per_pool(self):
@@ -91,34 +105,27 @@ class ConstraintValidator:
         )
 
     def validate_total_tasks_with_score(self):
-        score = defaultdict(lambda: defaultdict(int))
-        for pool, tasks in self.pools.items():
-            for task in tasks:
-                score[task.points][pool] += 1
-
-        for constraint in self.task_constraints.get(
-            "TasksWithScorePerPoolConstraint", []
-        ):
-            assert len(score[constraint.score]) == len(
-                self.pools
-            ), f"Not all of your pools have enough tasks with {constraint.score} points."
-            assert min(score[constraint.score].values()) >= constraint.tasks, (
-                f"You don't have enough tasks worth {constraint.score}"
-                + " points to sample from per pool."
-            )
-            for pool in score[constraint.score]:
-                score[constraint.score][pool] -= 1
-
-        score_sum = {key: len(val) for key, val in score.items()}
-        for constraint in self.task_constraints.get("TasksWithScoreConstraint", []):
-            assert (
-                constraint.tasks <= score_sum[constraint.score]
-            ), f"You don't have enough tasks worth {constraint.score} points to sample from"
-            score_sum[constraint.score] -= constraint.tasks
+        """
+        Check exactly that the score constraints can be met by every set of pools the
+        sampler can draw, so that sampling never runs out of tasks.
+        """
+        n_pools = len(self.pools)
+        if self.pool_constraint is not None:
+            n_pools = self.pool_constraint.pools
+        pools = {
+            pool: Counter(task.points for task in tasks)
+            for pool, tasks in self.pools.items()
+        }
+        cut = self.checker.check_pools(pools, n_pools)
+        assert cut is None, f"The constraints can not be met, {cut}."
 
     def validate(self):
         self.validate_pool_constraint()
         self.validate_number_of_task_constraints()
-        self.validate_tasks_per_pool()
         self.validate_total_tasks()
+        if self.has_global_constraints:
+            # Only valid exams are sampled, so not every set of pools has to be valid.
+            # The sampler checks that there is at least one valid exam instead.
+            return
+        self.validate_tasks_per_pool()
         self.validate_total_tasks_with_score()
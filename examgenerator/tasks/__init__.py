@@ -1,6 +1,14 @@
+from .index import TaskIndex, TaskInfo
 from .orderedtaskgroup import OrderedTaskGroup
 from .permutationgroup import PermutationTaskGroup
 from .sampledtaskgroup import SampledTaskGroup
 from .task import Task
 
-__all__ = ["Task", "OrderedTaskGroup", "PermutationTaskGroup", "SampledTaskGroup"]
+__all__ = [
+    "Task",
+    "TaskIndex",
+    "TaskInfo",
+    "OrderedTaskGroup",
+    "PermutationTaskGroup",
+    "SampledTaskGroup",
+]
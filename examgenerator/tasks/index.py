@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import nbformat
+from e2xgrader.utils.nbgrader_cells import get_points
+
+from .task import Task
+
+
+@dataclass
+class TaskInfo:
+    """Class for keeping the metadata of a task that is derived from its notebook"""
+
+    points: int
+
+
+class TaskIndex:
+    """
+    An index of task metadata that avoids parsing the notebook of a task every time
+    its metadata is needed.
+
+    Entries are keyed by the path of the task notebook and are invalidated
+    automatically when the size or modification time of the notebook changes.
+    Only the points of a task are indexed, as they are the only metadata the sampler
+    and its constraint validator read from the notebooks. The preprocessors read the
+    notebooks anyway and do not use the index.
+
+    Args:
+        path (str, optional): A JSON file to persist the index in. If None, the index
+            is only kept in memory. Defaults to None.
+    """
+
+    version = 2
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries = dict()
+        self.dirty = False
+        if path is not None and os.path.exists(path):
+            with open(path, "r") as f:
+                index = json.load(f)
+            if index.get("version") == self.version:
+                self.entries = index["tasks"]
+
+    def stamp(self, task: Task) -> List:
+        """Get the stamp of the notebook the metadata of a task is derived from"""
+        notebook = os.stat(task.notebook_path)
+        return [notebook.st_size, notebook.st_mtime_ns]
+
+    def get(self, task: Task) -> TaskInfo:
+        """
+        Get the metadata of a task, reading the notebook only if it is not indexed
+        or changed since it was indexed.
+
+        Args:
+            task (Task): The task.
+
+        Returns:
+            TaskInfo: The metadata of the task.
+        """
+        assert task.notebook_exists, f"No notebook found for task {task}"
+        key = os.path.abspath(task.notebook_path)
+        stamp = self.stamp(task)
+        entry = self.entries.get(key)
+        if entry is None or entry["stamp"] != stamp:
+            entry = dict(stamp=stamp, info=asdict(self.read_task_info(task)))
+            self.entries[key] = entry
+            self.dirty = True
+        return TaskInfo(**entry["info"])
+
+    def read_task_info(self, task: Task) -> TaskInfo:
+        nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
+        return TaskInfo(points=sum([get_points(cell) for cell in nb.cells]))
+
+    def save(self) -> None:
+        """Write the index to its file if it is persisted and has changed"""
+        if self.path is None or not self.dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(dict(version=self.version, tasks=self.entries), f)
+        os.replace(tmp, self.path)
+        self.dirty = False
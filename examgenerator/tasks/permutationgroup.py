@@ -1,5 +1,5 @@
 import random as rd
-from copy import deepcopy
+from copy import copy
 
 from .taskgroup import TaskGroup
 
@@ -14,12 +14,12 @@ class PermutationTaskGroup(TaskGroup):
             if isinstance(task, TaskGroup):
                 extracted_tasks.extend(task.get_tasks(seed=seed, source=source))
             else:
-                extracted_tasks.append(task)
+                extracted_tasks.append(copy(task))
         return extracted_tasks
 
     def get_tasks(self, seed=None, source=False):
         random = rd.Random(seed)
-        tasks = deepcopy(self.tasks)
+        tasks = list(self.tasks)
         if not source:
             random.shuffle(tasks)
         return self.list_tasks(tasks, seed=seed, source=source)
@@ -6,6 +6,7 @@ from ..sampling.constraints import (
     TasksPerPoolConstraint,
     TasksWithScorePerPoolConstraint,
 )
+from .index import TaskIndex
 from .task import Task
 from .taskgroup import TaskGroup
 
@@ -19,6 +20,7 @@ class SampledTaskGroup(TaskGroup):
         ],
         pool_constraint: PoolConstraint = None,
         permute: bool = False,
+        index: TaskIndex = None,
     ):
         super().__init__(tasks)
         self.sampler = TaskSampler(
@@ -26,6 +28,7 @@ class SampledTaskGroup(TaskGroup):
             pool_constraint=pool_constraint,
             task_constraints=task_constraints,
             permute=permute,
+            index=index,
         )
 
     def get_tasks(self, seed=None, source=None):
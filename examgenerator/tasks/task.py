@@ -1,7 +1,7 @@
 import glob
 import os
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple
 
 
 @dataclass
@@ -12,6 +12,7 @@ class Task:
     name: str
     root: str = ""
     points: int = -1
+    tags: Tuple[str, ...] = ()
 
     @property
     def relpath(self):
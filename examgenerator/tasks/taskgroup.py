@@ -1,4 +1,4 @@
-from copy import deepcopy
+from copy import copy
 
 
 class TaskGroup:
@@ -9,10 +9,11 @@ class TaskGroup:
         tasks = []
         for task in self.tasks:
             if isinstance(task, TaskGroup):
+                # Nested groups already return copies
                 tasks.extend(task.get_tasks(seed=seed, source=source))
             else:
-                tasks.append(task)
-        return deepcopy(tasks)
+                tasks.append(copy(task))
+        return tasks
 
     def get_tasks(self, seed=None, source=False):
         tasks = self.list_tasks(seed=seed, source=source)
@@ -0,0 +1,33 @@
+from .files import (
+    COPY_STRATEGIES,
+    break_link,
+    break_links,
+    copy_file,
+    copy_output_file,
+    copy_tree,
+    hash_file,
+    same_content,
+)
+from .fingerprint import TreeHasher, fingerprint
+from .notebook import read_notebook, write_notebook
+from .parallel import map_tasks
+from .store import BlobStore
+from .workspace import Workspace
+
+__all__ = [
+    "BlobStore",
+    "COPY_STRATEGIES",
+    "TreeHasher",
+    "Workspace",
+    "break_link",
+    "break_links",
+    "copy_file",
+    "copy_output_file",
+    "copy_tree",
+    "fingerprint",
+    "hash_file",
+    "map_tasks",
+    "read_notebook",
+    "same_content",
+    "write_notebook",
+]
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from functools import partial
+
+from ..instrumentation import get_metrics
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+COPY_STRATEGIES = ["copy", "hardlink", "reflink", "symlink"]
+
+# ioctl request to clone a file on Linux (see ioctl_ficlone(2))
+FICLONE = 0x40049409
+
+
+def reflink(src, dst):
+    """
+    Create a copy-on-write clone of a file.
+
+    Raises:
+        OSError: If the filesystem does not support cloning files.
+    """
+    if fcntl is None:
+        raise OSError("Reflinks are not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def copy_file(src, dst, strategy="copy", copy_function=shutil.copy2):
+    """
+    Copy a file using the given strategy.
+
+    Hardlinks and reflinks fall back to a full copy if the filesystem does not support
+    them, e.g. when src and dst are on different devices. Symlinks point to the file
+    src resolves to, so that no chains of links are created.
+
+    Args:
+        src (str): The source file.
+        dst (str): The destination file.
+        strategy (str, optional): One of "copy", "hardlink", "reflink" or "symlink".
+            Defaults to "copy".
+        copy_function (callable, optional): The function used for full copies.
+            Defaults to shutil.copy2.
+
+    Returns:
+        str: The destination file.
+    """
+    if strategy not in COPY_STRATEGIES:
+        raise ValueError(f"Unknown copy strategy {strategy}")
+    metrics = get_metrics()
+    if strategy == "symlink":
+        os.symlink(os.path.realpath(src), dst)
+        metrics.add("files_linked")
+        return dst
+    try:
+        if strategy == "hardlink":
+            os.link(src, dst)
+            metrics.add("files_linked")
+            return dst
+        if strategy == "reflink":
+            reflink(src, dst)
+            shutil.copystat(src, dst)
+            metrics.add("files_linked")
+            return dst
+    except OSError:
+        if os.path.lexists(dst):
+            os.remove(dst)
+    copy_function(src, dst)
+    if metrics.enabled:
+        metrics.add("bytes_copied", os.path.getsize(dst))
+    return dst
+
+
+def copy_output_file(src, dst, strategy="copy", copy_function=shutil.copy2):
+    """
+    Copy a file from a scratch or output directory using the given strategy.
+
+    With the symlink strategy only files that are links themselves are linked again.
+    Other files were created by the pipeline and may not outlive their directory,
+    so they are copied instead.
+    """
+    if strategy == "symlink" and not os.path.islink(src):
+        strategy = "copy"
+    return copy_file(src, dst, strategy=strategy, copy_function=copy_function)
+
+
+def copy_tree(src, dst, strategy="copy", output=False):
+    """
+    Copy a directory tree using the given strategy for each file.
+
+    Args:
+        src (str): The source directory.
+        dst (str): The destination directory.
+        strategy (str, optional): The copy strategy. Defaults to "copy".
+        output (bool, optional): If True, src is a scratch or output directory and files
+            are copied with `copy_output_file`. Defaults to False.
+    """
+    copy_function = copy_output_file if output else copy_file
+    return shutil.copytree(
+        src, dst, copy_function=partial(copy_function, strategy=strategy)
+    )
+
+
+def is_linked(path):
+    """Check if a file shares its storage with another file via a symlink or hardlink"""
+    return os.path.islink(path) or (os.path.exists(path) and os.stat(path).st_nlink > 1)
+
+
+def break_link(path):
+    """
+    Replace a symlinked or hardlinked file by a private copy of its content,
+    so it can be modified without modifying the file it is linked to.
+    """
+    if not is_linked(path):
+        return
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or None)
+    os.close(fd)
+    try:
+        shutil.copy2(os.path.realpath(path), tmp)
+        os.replace(tmp, path)
+        metrics = get_metrics()
+        if metrics.enabled:
+            metrics.add("bytes_copied", os.path.getsize(path))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def break_links(root):
+    """Break the links of all files in a directory tree"""
+    for dirpath, _, files in os.walk(root):
+        for file in files:
+            break_link(os.path.join(dirpath, file))
+
+
+def same_content(path, other, chunk_size=1 << 20):
+    """
+    Check if two files have the same content.
+
+    Files that are the same file, e.g. hardlinks or symlinks to each other, are equal
+    without reading them. Otherwise the contents are compared, not the file stats, as
+    linked copies of different files can share their size and modification time.
+    """
+    if os.path.samefile(path, other):
+        return True
+    if os.path.getsize(path) != os.path.getsize(other):
+        return False
+    with open(path, "rb") as f, open(other, "rb") as g:
+        while True:
+            chunk = f.read(chunk_size)
+            if chunk != g.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Compute the SHA-256 hex digest of the content of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
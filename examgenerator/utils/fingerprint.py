@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+
+from .files import hash_file
+
+
+class TreeHasher:
+    """
+    Computes content hashes of directory trees.
+
+    The digest of each file is remembered together with its size, modification time
+    and inode, so unchanged files are only read once per hasher.
+    """
+
+    ignored_dirs = [".ipynb_checkpoints", "__pycache__"]
+
+    def __init__(self):
+        self._files = dict()
+
+    def hash_file(self, path):
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        digest = hash_file(path)
+        self._files[path] = (key, digest)
+        return digest
+
+    def hash_tree(self, root):
+        """Compute a digest over the relative paths and contents of all files in root"""
+        digest = hashlib.sha256()
+        for dirpath, dirs, files in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if d not in self.ignored_dirs)
+            for file in sorted(files):
+                path = os.path.join(dirpath, file)
+                digest.update(os.path.relpath(path, root).encode())
+                digest.update(self.hash_file(path).encode())
+        return digest.hexdigest()
+
+
+def fingerprint(data):
+    """Compute a stable digest of JSON-like data, using repr for other objects"""
+    serialized = json.dumps(data, sort_keys=True, default=repr)
+    return hashlib.sha256(serialized.encode()).hexdigest()
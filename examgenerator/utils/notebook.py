@@ -0,0 +1,51 @@
+import nbformat
+
+from ..instrumentation import get_metrics
+from .files import break_link
+
+
+def read_notebook(task, resources):
+    """
+    Read the notebook of a task.
+
+    If the resources carry a `notebooks` dict, each notebook is only parsed once and
+    the parsed notebook is kept in memory for the following preprocessors.
+
+    Args:
+        task (Task): The task to read the notebook of.
+        resources (dict): The resources of the exam.
+
+    Returns:
+        NotebookNode: The notebook of the task.
+    """
+    notebooks = resources.get("notebooks")
+    if notebooks is None or task.relpath not in notebooks:
+        get_metrics().add("notebook_reads")
+    if notebooks is None:
+        return nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
+    if task.relpath not in notebooks:
+        notebooks[task.relpath] = nbformat.read(
+            task.notebook_path, as_version=nbformat.NO_CONVERT
+        )
+    return notebooks[task.relpath]
+
+
+def write_notebook(task, nb, resources):
+    """
+    Write the notebook of a task.
+
+    If the resources carry a `notebooks` dict, the notebook is only stored in memory.
+    Otherwise links to the notebook file are broken before it is overwritten.
+
+    Args:
+        task (Task): The task to write the notebook of.
+        nb (NotebookNode): The notebook to write.
+        resources (dict): The resources of the exam.
+    """
+    notebooks = resources.get("notebooks")
+    if notebooks is None:
+        get_metrics().add("notebook_writes")
+        break_link(task.notebook_path)
+        nbformat.write(nb, task.notebook_path)
+    else:
+        notebooks[task.relpath] = nb
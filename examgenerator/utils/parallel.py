@@ -0,0 +1,29 @@
+import contextvars
+from concurrent.futures import wait
+
+
+def map_tasks(func, tasks, resources):
+    """
+    Call a function for each task of an exam.
+
+    If the resources carry a `task_executor`, the tasks are processed concurrently.
+    Each call runs in a copy of the current context, so it is attributed to the same
+    metrics and stage as a serial call.
+
+    Args:
+        func (callable): The function to call with each task.
+        tasks (List[Task]): The tasks.
+        resources (dict): The resources of the exam.
+
+    Returns:
+        list: The return values of func in the order of the tasks.
+    """
+    executor = resources.get("task_executor")
+    if executor is None or len(tasks) < 2:
+        return [func(task) for task in tasks]
+    futures = [
+        executor.submit(contextvars.copy_context().run, func, task) for task in tasks
+    ]
+    # Let all tasks finish before an error is raised, they share the scratch directory
+    wait(futures)
+    return [future.result() for future in futures]
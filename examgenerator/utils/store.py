@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import tempfile
+
+from ..instrumentation import get_metrics
+from .files import copy_file, hash_file
+
+
+class BlobStore:
+    """
+    A content-addressed store of files keyed by the SHA-256 hash of their content.
+
+    Files are added once and linked into the exam directories of the students,
+    so identical files share their storage. A manifest records which files each
+    student received.
+
+    Args:
+        root (str): The directory of the store.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._digests = dict()
+        self._sources = dict()
+
+    def path(self, digest):
+        """Get the path of the blob with the given digest"""
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def add(self, src):
+        """
+        Add a file to the store if its content is not stored yet.
+
+        Args:
+            src (str): The file to add.
+
+        Returns:
+            str: The digest of the file.
+        """
+        digest = self.source_digest(src)
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            os.close(fd)
+            try:
+                shutil.copyfile(src, tmp)
+                os.replace(tmp, path)
+                get_metrics().add("bytes_copied", os.path.getsize(path))
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        self._remember(path, digest)
+        return digest
+
+    def source_digest(self, src):
+        """Get the digest of a file, hashing it only if it changed since it was hashed"""
+        stat = os.stat(src)
+        key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        digest = self._sources.get(key)
+        if digest is None:
+            digest = hash_file(src)
+            self._sources[key] = digest
+        return digest
+
+    def link(self, digest, dst):
+        """Create a file with the content of a blob, sharing its storage if possible"""
+        copy_file(
+            self.path(digest), dst, strategy="hardlink", copy_function=shutil.copyfile
+        )
+        self._remember(dst, digest)
+        return dst
+
+    def digest(self, path):
+        """Get the digest of a file, avoiding to hash files that are linked to a blob"""
+        stat = os.stat(path)
+        return self._digests.get((stat.st_dev, stat.st_ino)) or hash_file(path)
+
+    def _remember(self, path, digest):
+        stat = os.stat(path)
+        self._digests[(stat.st_dev, stat.st_ino)] = digest
+
+    def manifest_path(self, exam_name, student):
+        return os.path.join(self.root, "manifests", exam_name, f"{student}.json")
+
+    def write_manifest(self, exam_name, student, path):
+        """
+        Record the digests of all files in a directory of a student.
+
+        Args:
+            exam_name (str): The name of the exam.
+            student (str): The name of the student.
+            path (str): The directory of the student.
+
+        Returns:
+            dict: The manifest mapping paths relative to `path` to digests.
+        """
+        files = dict()
+        for root, dirs, filenames in os.walk(path):
+            dirs.sort()
+            for filename in sorted(filenames):
+                file = os.path.join(root, filename)
+                files[os.path.relpath(file, path)] = self.digest(file)
+        manifest = dict(exam_name=exam_name, student=student, files=files)
+        manifest_path = self.manifest_path(exam_name, student)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        return manifest
+
+    def read_manifest(self, exam_name, student):
+        """Read the manifest of a student or return None if there is none"""
+        manifest_path = self.manifest_path(exam_name, student)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, "r") as f:
+            return json.load(f)
@@ -0,0 +1,230 @@
+import os
+import shutil
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+from ..instrumentation import get_metrics
+from .files import copy_tree
+
+
+def tree_stamp(root) -> List[Tuple]:
+    """Get the path, size, modification time and inode of all files in a tree"""
+    stamp = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs.sort()
+        for file in sorted(files):
+            path = os.path.join(dirpath, file)
+            stat = os.lstat(path)
+            stamp.append(
+                (
+                    os.path.relpath(path, root),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    stat.st_ino,
+                )
+            )
+    return stamp
+
+
+def link(src, dst):
+    """Hardlink a file without following symlinks, copy it if that is not possible"""
+    try:
+        os.link(src, dst, follow_symlinks=False)
+        get_metrics().add("files_linked")
+    except (OSError, NotImplementedError):
+        shutil.copy2(src, dst, follow_symlinks=False)
+        metrics = get_metrics()
+        if metrics.enabled:
+            metrics.add("bytes_copied", os.lstat(dst).st_size)
+
+
+@dataclass
+class StagedTask:
+    """Class for keeping the pristine copy of a task in a workspace"""
+
+    path: str
+    stamp: List[Tuple]
+    # The inode, size and modification time of each file of the pristine copy
+    files: Dict[str, Tuple[int, int, int]] = field(default_factory=dict)
+    dirs: Set[str] = field(default_factory=set)
+
+
+class Workspace:
+    """
+    A scratch directory that is reused for the exams of many students.
+
+    The first time a task is checked out, a pristine copy of it is staged in
+    `<root>/pristine`. Exams are built in slots, directories in which the files of the
+    tasks are hardlinks to their pristine copies. When a slot is reused, only the files
+    the pipeline replaced, created or removed are reset, e.g. the notebooks, the removed
+    scramble packages and the files created by scramblers. The tasks of earlier
+    students that the current student did not sample are removed (see `prune`).
+
+    Files in a slot must not be modified in place, links have to be broken first
+    (see `break_link`). A pristine copy that was modified anyway is staged again.
+
+    Args:
+        root (str): The directory of the workspace.
+        strategy (str, optional): The copy strategy used to stage the pristine copies.
+            Defaults to "copy".
+    """
+
+    def __init__(self, root, strategy="copy"):
+        self.root = root
+        self.strategy = strategy
+        self._staged = dict()
+        self._free_slots = []
+        self._n_slots = 0
+        self._n_staged = 0
+        self._lock = threading.Lock()
+        self._stage_locks = defaultdict(threading.Lock)
+
+    @contextmanager
+    def slot(self):
+        """Borrow a slot to build an exam in, it is returned to the workspace on exit"""
+        with self._lock:
+            if self._free_slots:
+                path = self._free_slots.pop()
+            else:
+                path = os.path.join(self.root, "slots", str(self._n_slots))
+                self._n_slots += 1
+        os.makedirs(path, exist_ok=True)
+        try:
+            yield path
+        finally:
+            with self._lock:
+                self._free_slots.append(path)
+
+    def prune(self, path, relpaths):
+        """
+        Remove everything from a slot but the given tasks, e.g. the tasks that earlier
+        students sampled and the current student did not.
+
+        Args:
+            path (str): The directory of the slot.
+            relpaths (Iterable[str]): The paths of the tasks to keep, relative to the
+                slot.
+        """
+        keep = {os.path.normpath(relpath) for relpath in relpaths}
+        parents = set()
+        for relpath in keep:
+            parent = os.path.dirname(relpath)
+            while parent:
+                parents.add(parent)
+                parent = os.path.dirname(parent)
+        pending = [""]
+        while pending:
+            directory = pending.pop()
+            for entry in os.scandir(os.path.join(path, directory)):
+                relpath = os.path.join(directory, entry.name)
+                if relpath in keep:
+                    continue
+                if relpath in parents and entry.is_dir(follow_symlinks=False):
+                    pending.append(relpath)
+                elif entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+
+    def stage(self, src) -> StagedTask:
+        """
+        Get the pristine copy of a task, staging it if it was not staged yet or if the
+        files of the task changed since it was staged.
+
+        Args:
+            src (str): The directory of the task.
+
+        Returns:
+            StagedTask: The pristine copy.
+        """
+        with self._lock:
+            lock = self._stage_locks[src]
+        with lock:
+            stamp = tree_stamp(src)
+            staged = self._staged.get(src)
+            if staged is not None and staged.stamp == stamp:
+                return staged
+            # Slots may still link to an outdated copy, so a new copy is staged
+            with self._lock:
+                path = os.path.join(self.root, "pristine", str(self._n_staged))
+                self._n_staged += 1
+            copy_tree(src, path, strategy=self.strategy)
+            staged = StagedTask(path=path, stamp=stamp)
+            for dirpath, dirs, files in os.walk(path):
+                staged.dirs.update(
+                    os.path.relpath(os.path.join(dirpath, d), path) for d in dirs
+                )
+                for file in files:
+                    stat = os.lstat(os.path.join(dirpath, file))
+                    staged.files[os.path.relpath(os.path.join(dirpath, file), path)] = (
+                        stat.st_ino,
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                    )
+            self._staged[src] = staged
+            return staged
+
+    def checkout(self, src, dst):
+        """
+        Make dst a copy of the task in src, linking its files to the pristine copy.
+        If dst already holds the task, only the files that differ are reset.
+
+        Args:
+            src (str): The directory of the task.
+            dst (str): The directory of the task in a slot.
+        """
+        staged = self.stage(src)
+        if os.path.isdir(dst):
+            if self.reset(staged, dst):
+                return
+            staged = self.stage(src)
+        if os.path.isdir(dst) and not os.path.islink(dst):
+            shutil.rmtree(dst)
+        elif os.path.lexists(dst):
+            os.remove(dst)
+        os.makedirs(dst)
+        for directory in sorted(staged.dirs):
+            os.makedirs(os.path.join(dst, directory), exist_ok=True)
+        for file in staged.files:
+            link(os.path.join(staged.path, file), os.path.join(dst, file))
+
+    def reset(self, staged: StagedTask, dst) -> bool:
+        """
+        Reset the files of a task in a slot to the pristine copy.
+
+        Returns:
+            bool: False if the pristine copy was modified through a link and the task
+                has to be checked out again, True otherwise.
+        """
+        seen = set()
+        for dirpath, dirs, files in os.walk(dst):
+            for directory in list(dirs):
+                relpath = os.path.relpath(os.path.join(dirpath, directory), dst)
+                if relpath not in staged.dirs:
+                    shutil.rmtree(os.path.join(dirpath, directory))
+                    dirs.remove(directory)
+            for file in files:
+                path = os.path.join(dirpath, file)
+                relpath = os.path.relpath(path, dst)
+                expected = staged.files.get(relpath)
+                if expected is None:
+                    os.remove(path)
+                    continue
+                stat = os.lstat(path)
+                if stat.st_ino == expected[0]:
+                    if (stat.st_size, stat.st_mtime_ns) != expected[1:]:
+                        # The pristine copy was modified, stage it again
+                        staged.stamp = None
+                        return False
+                else:
+                    os.remove(path)
+                    link(os.path.join(staged.path, relpath), path)
+                seen.add(relpath)
+        for directory in staged.dirs:
+            os.makedirs(os.path.join(dst, directory), exist_ok=True)
+        for relpath in staged.files.keys() - seen:
+            link(os.path.join(staged.path, relpath), os.path.join(dst, relpath))
+        return True
@@ -0,0 +1,30 @@
+import pytest
+
+from examgenerator.preprocessors import ScrambleTasks
+
+from .helpers import SCRAMBLER, SCRAMBLER_WITH_EXTRA_FILES, write_task
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """A pool of three pools with four tasks each, half of them randomizable"""
+    root = tmp_path / "pool"
+    tasks = []
+    for p in range(3):
+        for t in range(4):
+            scrambler = None
+            if t % 2 == 0:
+                scrambler = SCRAMBLER_WITH_EXTRA_FILES if t == 0 else SCRAMBLER
+            tasks.append(
+                write_task(
+                    root, f"pool{p}", f"task{t}", points=1 + t % 2, scrambler=scrambler
+                )
+            )
+    return tasks
+
+
+@pytest.fixture(autouse=True)
+def clear_scramblers():
+    """Load the scramblers of each test from its own pool"""
+    yield
+    ScrambleTasks.clear_cache()
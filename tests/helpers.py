@@ -0,0 +1,150 @@
+import hashlib
+import os
+import subprocess
+import sys
+
+import nbformat
+from nbformat.v4 import new_code_cell, new_markdown_cell, new_notebook
+from traitlets.config import Config
+
+from examgenerator import ExamGenerator
+from examgenerator.tasks import Task
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRAMBLER = """import random
+
+
+def replacement_variables(seed):
+    rng = random.Random(seed)
+    return dict(a=rng.randint(0, 100), b=rng.choice(["x", "y", "z"]))
+"""
+
+SCRAMBLER_WITH_EXTRA_FILES = (
+    SCRAMBLER
+    + """
+extra_files = ["data/generated.csv"]
+
+
+def create_extra_files(seed, path):
+    import os
+
+    with open(os.path.join(path, "data", "generated.csv"), "w") as f:
+        f.write("seed,{}\\n".format(seed))
+"""
+)
+
+
+STATEFUL_SCRAMBLER = """
+import os
+
+# The log is written to the directory of all pools, outside of the task
+LOG = os.path.join(os.path.dirname(__file__), *[os.pardir] * 3, "calls.log")
+last_seed = None
+
+
+def replacement_variables(seed):
+    global last_seed
+    last_seed = seed
+    with open(LOG, "a") as f:
+        f.write("{}\\n".format(seed))
+    return dict(a=seed)
+
+
+def create_extra_files(seed, path):
+    with open(os.path.join(path, "data", "seed.csv"), "w") as f:
+        f.write(str(last_seed))
+"""
+
+
+def nbgrader_cell(cell, grade_id, grade=False, solution=False, points=None):
+    cell.metadata["nbgrader"] = dict(
+        grade=grade,
+        grade_id=grade_id,
+        locked=not solution,
+        schema_version=3,
+        solution=solution,
+        task=False,
+    )
+    if points is not None:
+        cell.metadata["nbgrader"]["points"] = points
+    return cell
+
+
+def write_task(root, pool, name, points=1, files=None, scrambler=None):
+    """
+    Create a task with a header, a description that uses the data files, a solution
+    and a test cell.
+
+    Args:
+        files (dict, optional): The content of the files of the task by relative path.
+        scrambler (str, optional): The source of the scramble package.
+    """
+    task = Task(pool=pool, name=name, root=str(root))
+    os.makedirs(task.path)
+    files = files or {"data/common.csv": "same\n", f"data/{name}.csv": f"{pool}\n"}
+    nb = new_notebook()
+    nb.cells = [
+        nbgrader_cell(new_markdown_cell(f"# {pool} {name}"), "header"),
+        nbgrader_cell(
+            new_markdown_cell(
+                "Use " + ", ".join(f"`{file}`" for file in sorted(files)) + " {{ a }}"
+            ),
+            "description",
+        ),
+        nbgrader_cell(new_code_cell("# YOUR CODE HERE"), "solution", solution=True),
+        nbgrader_cell(
+            new_code_cell("assert True\n### BEGIN HIDDEN TESTS\n### END HIDDEN TESTS"),
+            "test",
+            grade=True,
+            points=points,
+        ),
+    ]
+    for idx, cell in enumerate(nb.cells):
+        cell.id = f"{pool}-{name}-{idx}"
+    nbformat.write(nb, task.notebook_path)
+    for file, content in files.items():
+        path = os.path.join(task.path, file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = "wb" if isinstance(content, bytes) else "w"
+        with open(path, mode) as f:
+            f.write(content)
+    if scrambler is not None:
+        os.makedirs(os.path.join(task.path, "scramble"))
+        with open(os.path.join(task.path, "scramble", "__init__.py"), "w") as f:
+            f.write(scrambler)
+    return task
+
+
+def make_generator(dst, backend=None, **traits):
+    """Create a generator for the exam "exam" with the given ExamGenerator traits"""
+    config = Config()
+    for name, value in traits.items():
+        config.ExamGenerator[name] = value
+    return ExamGenerator(str(dst), "exam", config=config, backend=backend)
+
+
+def tree_hash(root):
+    """Hash the relative paths and contents of all files in a tree"""
+    digest = hashlib.sha256()
+    for dirpath, dirs, files in sorted(os.walk(root)):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for file in sorted(files):
+            path = os.path.join(dirpath, file)
+            digest.update(os.path.relpath(path, root).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def run_python(code, hash_seed):
+    """Run code in a new interpreter with the given hash seed and return its output"""
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import tarfile
+import zipfile
+
+import nbformat
+import pytest
+from nbformat.v4 import new_markdown_cell, new_notebook
+
+from examgenerator.backends import (
+    InMemoryObjectStore,
+    LocalBackend,
+    ObjectStoreBackend,
+    TarBackend,
+    ZipBackend,
+)
+from examgenerator.sampling.constraints import PoolConstraint, TasksPerPoolConstraint
+from examgenerator.tasks import SampledTaskGroup
+
+from .helpers import make_generator
+
+STUDENTS = {f"student{i}": i for i in range(40)}
+
+
+def read_tree(root):
+    """Get the content of all files in a directory by relative path"""
+    files = dict()
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def read_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name) for name in archive.namelist()}
+
+
+def read_tar(path):
+    with tarfile.open(path) as archive:
+        return {
+            member.name: archive.extractfile(member).read()
+            for member in archive.getmembers()
+        }
+
+
+def read_object_store(client):
+    return {key: client.get_object(key) for key in client.list_objects()}
+
+
+def make_group(pool):
+    return SampledTaskGroup(pool, [TasksPerPoolConstraint(1)], PoolConstraint(2))
+
+
+@pytest.fixture
+def expected(tmp_path, pool):
+    generator = make_generator(tmp_path / "local")
+    results = generator.make_exams(STUDENTS, make_group(pool))
+    assert all(result.succeeded for result in results.values())
+    return read_tree(tmp_path / "local")
+
+
+def test_local_backend_round_trip(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    src = tmp_path / "src.csv"
+    src.write_text("1,2\n")
+    nb = new_notebook(cells=[new_markdown_cell("# Exam")])
+
+    backend.add_file(str(src), "exam/files/data.csv")
+    backend.write_notebook(nb, "exam/exam.ipynb")
+    assert backend.exists("exam/files")
+    assert backend.read("exam/files/data.csv") == b"1,2\n"
+    assert backend.same_content(str(src), "exam/files/data.csv")
+    assert backend.read_notebook("exam/exam.ipynb").cells[0].source == "# Exam"
+
+    backend.copy_tree("exam", "copy")
+    assert backend.read("copy/files/data.csv") == b"1,2\n"
+    backend.remove("exam")
+    assert not backend.exists("exam")
+    assert backend.exists("copy/exam.ipynb")
+
+
+@pytest.mark.parametrize("backend_class", [ZipBackend, TarBackend])
+def test_archive_backend_round_trip(tmp_path, backend_class):
+    src = tmp_path / "src.csv"
+    src.write_text("1,2\n")
+    nb = new_notebook(cells=[new_markdown_cell("# Exam")])
+    archive = tmp_path / "out.archive"
+
+    with backend_class(str(archive)) as backend:
+        backend.add_file(str(src), "exam/files/data.csv")
+        backend.add_file(str(src), "exam/files/removed.csv")
+        backend.write_notebook(nb, "exam/exam.ipynb")
+        # Files are readable until they are committed
+        assert backend.read("exam/files/data.csv") == b"1,2\n"
+        backend.remove("exam/files/removed.csv")
+        backend.commit(["exam"])
+        assert backend.exists("exam/exam.ipynb")
+        with pytest.raises(ValueError):
+            backend.read("exam/exam.ipynb")
+
+    read = read_zip if backend_class is ZipBackend else read_tar
+    files = read(str(archive))
+    assert sorted(files) == ["exam/exam.ipynb", "exam/files/data.csv"]
+    assert files["exam/files/data.csv"] == b"1,2\n"
+    assert nbformat.reads(files["exam/exam.ipynb"].decode(), 4).cells[0].source == (
+        "# Exam"
+    )
+
+
+def test_object_store_backend_round_trip(tmp_path):
+    src = tmp_path / "src.csv"
+    src.write_text("1,2\n")
+    client = InMemoryObjectStore()
+    backend = ObjectStoreBackend(client, prefix="exams")
+
+    backend.add_file(str(src), "exam/files/data.csv")
+    backend.commit(["exam"])
+    assert client.list_objects() == ["exams/exam/files/data.csv"]
+    assert backend.read("exam/files/data.csv") == b"1,2\n"
+    assert backend.exists("exam")
+    assert not backend.exists("ex")
+    backend.remove("exam")
+    assert client.list_objects() == []
+
+
+@pytest.mark.parametrize("output_backend", ["zip", "tar"])
+def test_archives_hold_the_same_exams_as_a_directory(
+    tmp_path, pool, expected, output_backend
+):
+    archive = tmp_path / f"exams.{output_backend}"
+    generator = make_generator(archive, output_backend=output_backend)
+    results = generator.make_exams(STUDENTS, make_group(pool))
+    generator.close()
+
+    assert all(result.succeeded for result in results.values())
+    read = read_zip if output_backend == "zip" else read_tar
+    assert read(str(archive)) == expected
+
+
+@pytest.mark.parametrize("output_backend", ["zip", "tar", "objectstore"])
+def test_async_generation_into_buffered_backends(
+    tmp_path, pool, expected, output_backend
+):
+    archive = str(tmp_path / f"exams.{output_backend}")
+    client = InMemoryObjectStore()
+    backend = None
+    if output_backend == "objectstore":
+        backend = ObjectStoreBackend(client)
+        generator = make_generator(tmp_path / "unused", backend=backend)
+    else:
+        generator = make_generator(archive, output_backend=output_backend)
+    results = asyncio.run(
+        generator.make_exams_async(STUDENTS, make_group(pool), concurrency=8)
+    )
+    generator.close()
+
+    assert all(result.succeeded for result in results.values())
+    if output_backend == "zip":
+        assert read_zip(archive) == expected
+    elif output_backend == "tar":
+        assert read_tar(archive) == expected
+    else:
+        assert read_object_store(client) == expected
+
+
+@pytest.mark.parametrize("output_backend", ["zip", "tar"])
+def test_archives_of_the_same_exams_are_equal(tmp_path, pool, output_backend):
+    students = dict(list(STUDENTS.items())[:4])
+    archives = []
+    for run in range(2):
+        archive = tmp_path / f"exams{run}.{output_backend}"
+        generator = make_generator(archive, output_backend=output_backend)
+        generator.make_exams(students, make_group(pool))
+        generator.close()
+        archives.append(archive.read_bytes())
+
+    assert archives[0] == archives[1]
+
+
+class CountingObjectStore(InMemoryObjectStore):
+    def __init__(self):
+        super().__init__()
+        self.listings = 0
+
+    def list_objects(self, prefix=""):
+        self.listings += 1
+        return super().list_objects(prefix)
+
+
+def test_object_store_is_listed_once_per_build(tmp_path, pool, expected):
+    client = CountingObjectStore()
+    client.put_object("exams/stale/file.csv", b"")
+    backend = ObjectStoreBackend(client, prefix="exams")
+    generator = make_generator(tmp_path / "unused", backend=backend)
+    results = generator.make_exams(STUDENTS, make_group(pool))
+    generator.close()
+
+    assert all(result.succeeded for result in results.values())
+    assert client.listings == 1
+    assert backend.exists("stale")
+    backend.remove("stale")
+    assert not backend.exists("stale/file.csv")
+    assert client.listings == 1
+    assert {
+        key[len("exams/") :]: data for key, data in read_object_store(client).items()
+    } == expected
@@ -0,0 +1,39 @@
+import os
+
+import nbformat
+
+from examgenerator.preprocessors import CompileTasks
+
+from .helpers import write_task
+
+
+def test_compiled_tasks_are_reused_until_the_task_changes(tmp_path):
+    task = write_task(tmp_path, "p0", "t0", files={"data/a.csv": "1\n"})
+    compiler = CompileTasks()
+    compiled = compiler.get_compiled_task(task)
+    assert compiled.files == ["data/a.csv"]
+    assert compiler.get_compiled_task(task) is compiled
+
+    # A file in a new nested directory
+    os.makedirs(os.path.join(task.path, "data", "nested"))
+    with open(os.path.join(task.path, "data", "nested", "b.csv"), "w") as f:
+        f.write("2\n")
+    compiled = compiler.get_compiled_task(task)
+    assert sorted(compiled.files) == ["data/a.csv", "data/nested/b.csv"]
+
+    # A file in a nested directory that is already known
+    with open(os.path.join(task.path, "data", "nested", "c.csv"), "w") as f:
+        f.write("3\n")
+    compiled = compiler.get_compiled_task(task)
+    assert len(compiled.files) == 3
+
+    # A directory that did not exist before
+    os.makedirs(os.path.join(task.path, "img"))
+    with open(os.path.join(task.path, "img", "plot.png"), "wb") as f:
+        f.write(b"png")
+    assert "img/plot.png" in compiler.get_compiled_task(task).files
+
+    nb = nbformat.read(task.notebook_path, as_version=nbformat.NO_CONVERT)
+    nb.cells = nb.cells[:1]
+    nbformat.write(nb, task.notebook_path)
+    assert len(compiler.get_compiled_task(task).templates) == 1
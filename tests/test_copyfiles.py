@@ -0,0 +1,124 @@
+import os
+
+import nbformat
+import pytest
+
+from examgenerator.tasks import OrderedTaskGroup
+
+from .helpers import make_generator, write_task
+
+STRATEGIES = ["copy", "hardlink", "reflink", "symlink"]
+
+
+@pytest.fixture
+def colliding_tasks(tmp_path):
+    """Two tasks with different files of the same name, size and modification time"""
+    tasks = [
+        write_task(
+            tmp_path / "pool",
+            pool,
+            "task",
+            files={"data/x.csv": content, "data/same.csv": "same"},
+        )
+        for pool, content in [("b", "1,2"), ("c", "3,4")]
+    ]
+    for task in tasks:
+        for file in ["x.csv", "same.csv"]:
+            os.utime(os.path.join(task.path, "data", file), ns=(10**18, 10**18))
+    return OrderedTaskGroup(tasks)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+@pytest.mark.parametrize(
+    "traits",
+    [dict(), dict(reuse_workspace=True), dict(task_workers=2)],
+    ids=["serial", "workspace", "parallel"],
+)
+def test_colliding_files_are_renamed(tmp_path, colliding_tasks, strategy, traits):
+    generator = make_generator(tmp_path / "out", copy_strategy=strategy, **traits)
+    with generator:
+        generator.make_exam("student", colliding_tasks)
+
+    release = tmp_path / "out" / "release" / "exam" / "student"
+    files = release / "files" / "data"
+    assert sorted(os.listdir(files)) == ["same.csv", "x.csv", "x_1.csv"]
+    assert read(files / "x.csv") == "1,2"
+    assert read(files / "x_1.csv") == "3,4"
+
+    nb = nbformat.read(str(release / "exam.ipynb"), as_version=4)
+    sources = "\n".join(cell.source for cell in nb.cells)
+    assert "`files/data/x.csv`" in sources
+    assert "`files/data/x_1.csv`" in sources
+    assert sources.count("`files/data/same.csv`") == 2
+
+
+OVERWRITING_SCRAMBLER = """
+import os
+
+{declaration}
+
+
+def replacement_variables(seed):
+    return dict(a=seed)
+
+
+def create_extra_files(seed, path):
+    with open(os.path.join(path, "data", "out.csv"), "w") as f:
+        f.write(str(seed))
+"""
+
+
+@pytest.mark.parametrize(
+    "declaration, copied",
+    [
+        ("", ["data/big.csv", "data/out.csv", "scramble/__init__.py"]),
+        ('extra_files = ["data/out.csv"]', ["data/out.csv"]),
+    ],
+    ids=["undeclared", "declared"],
+)
+@pytest.mark.parametrize("traits", [dict(), dict(reuse_workspace=True)])
+def test_scramblers_break_the_links_of_the_files_they_write(
+    tmp_path, declaration, copied, traits
+):
+    task = write_task(
+        tmp_path / "pool",
+        "p0",
+        "t0",
+        files={"data/big.csv": "x" * 1000, "data/out.csv": "original"},
+        scrambler=OVERWRITING_SCRAMBLER.format(declaration=declaration),
+    )
+    generator = make_generator(
+        tmp_path / "out", copy_strategy="hardlink", collect_metrics=True, **traits
+    )
+    with generator:
+        generator.make_exam("student", OrderedTaskGroup([task]), seed=7)
+
+    assert read(os.path.join(task.path, "data", "out.csv")) == "original"
+    files = tmp_path / "out" / "release" / "exam" / "student" / "files" / "data"
+    assert read(files / "out.csv") == "7"
+    # The notebook is copied before it is written in any case
+    copied = [os.path.basename(task.notebook_path)] + copied
+    stages = generator.metrics.to_dict()["stages"]
+    assert stages["ScrambleTasks"]["bytes_copied"] == sum(
+        os.path.getsize(os.path.join(task.path, file)) for file in copied
+    )
+
+
+def test_slots_drop_the_tasks_of_earlier_students(tmp_path):
+    tasks = [write_task(tmp_path / "pool", f"p{t}", f"t{t}") for t in range(3)]
+    generator = make_generator(tmp_path / "out", reuse_workspace=True)
+    with generator:
+        generator.make_exam("student0", OrderedTaskGroup(tasks[:2]))
+        generator.make_exam("student1", OrderedTaskGroup(tasks[1:]))
+        (slot,) = generator.get_workspace()._free_slots
+        assert sorted(os.listdir(slot)) == ["p1", "p2"]
+        assert os.listdir(os.path.join(slot, "p1")) == ["t1"]
+
+    release = tmp_path / "out" / "release" / "exam" / "student1"
+    files = ["common.csv", "t1.csv", "t2.csv"]
+    assert sorted(os.listdir(release / "files" / "data")) == files
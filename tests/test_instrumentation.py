@@ -0,0 +1,106 @@
+import json
+import os
+
+from examgenerator.tasks import OrderedTaskGroup
+
+from .helpers import make_generator, write_task
+
+PREFIX = "examgenerator"
+STAGES = [
+    "ClearHiddenTests",
+    "ClearMarkScheme",
+    "ClearOutput",
+    "ClearSolutions",
+    "LockCells",
+    "MakeExam",
+    "MakeSolution",
+    "RemoveExam",
+    "RemoveSolutionFiles",
+    "WriteRelease",
+]
+TASK_STAGES = ["CompileTasks", "CopyFiles", "CopyTasks", "GenerateTaskIDs"]
+
+
+def build(tmp_path):
+    tasks = [
+        write_task(tmp_path / "pool", "p0", "t0", files={"data/a.csv": "1234"}),
+        write_task(tmp_path / "pool", "p1", "t1", files={"data/b.csv": "12"}),
+    ]
+    generator = make_generator(tmp_path / "out", collect_metrics=True)
+    with generator:
+        assert generator.make_exam("student", OrderedTaskGroup(tasks), seed=0)
+    return tasks, generator.metrics
+
+
+def labels(stage, task=None):
+    task = "" if task is None else f',task="{task}"'
+    return f'{{stage="{stage}",student="student"{task}}}'
+
+
+def test_counters_of_a_build(tmp_path):
+    tasks, metrics = build(tmp_path)
+    notebooks = [os.path.getsize(task.notebook_path) for task in tasks]
+
+    stages = json.loads(metrics.to_json())["stages"]
+    counters = {
+        stage: {name: value for name, value in values.items() if name != "seconds"}
+        for stage, values in stages.items()
+    }
+    assert counters == {
+        **{stage: dict(calls=1) for stage in STAGES + ["ScrambleTasks"]},
+        "CompileTasks": dict(calls=1, notebook_reads=2),
+        "CopyFiles": dict(calls=1, bytes_copied=6, notebook_reads=2, notebook_writes=2),
+        "CopyTasks": dict(calls=1, bytes_copied=sum(notebooks) + 6),
+        "GenerateTaskIDs": dict(calls=1, notebook_reads=2, notebook_writes=2),
+        "MakeExam": dict(calls=1, notebook_reads=2),
+        "MakeSolution": dict(calls=1, bytes_copied=6, notebook_writes=1),
+        "WriteRelease": dict(calls=1, notebook_writes=1),
+    }
+    assert all(stages[stage]["seconds"] > 0 for stage in stages)
+
+
+def test_prometheus_text_of_a_build(tmp_path):
+    tasks, metrics = build(tmp_path)
+    notebooks = [os.path.getsize(task.notebook_path) for task in tasks]
+    task_ids = [task.relpath for task in tasks]
+
+    lines = metrics.to_prometheus().splitlines()
+    seconds = [line for line in lines if line.startswith(f"{PREFIX}_seconds_total{{")]
+    assert [line for line in lines if line not in seconds] == [
+        f"# TYPE {PREFIX}_bytes_copied_total counter",
+        f"{PREFIX}_bytes_copied_total{labels('CopyFiles', 'p0/t0')} 4",
+        f"{PREFIX}_bytes_copied_total{labels('CopyFiles', 'p1/t1')} 2",
+        f"{PREFIX}_bytes_copied_total{labels('CopyTasks', 'p0/t0')} {notebooks[0] + 4}",
+        f"{PREFIX}_bytes_copied_total{labels('CopyTasks', 'p1/t1')} {notebooks[1] + 2}",
+        f"{PREFIX}_bytes_copied_total{labels('MakeSolution')} 6",
+        f"# TYPE {PREFIX}_calls_total counter",
+        *[
+            f"{PREFIX}_calls_total{labels(stage, task)} 1"
+            for stage in sorted(STAGES + TASK_STAGES + ["ScrambleTasks"])
+            for task in [None] + (task_ids if stage not in STAGES else [])
+        ],
+        f"# TYPE {PREFIX}_notebook_reads_total counter",
+        *[
+            f"{PREFIX}_notebook_reads_total{labels(stage, task)} 1"
+            for stage in ["CompileTasks", "CopyFiles", "GenerateTaskIDs"]
+            for task in task_ids
+        ],
+        f"{PREFIX}_notebook_reads_total{labels('MakeExam')} 2",
+        f"# TYPE {PREFIX}_notebook_writes_total counter",
+        *[
+            f"{PREFIX}_notebook_writes_total{labels(stage, task)} 1"
+            for stage in ["CopyFiles", "GenerateTaskIDs"]
+            for task in task_ids
+        ],
+        f"{PREFIX}_notebook_writes_total{labels('MakeSolution')} 1",
+        f"{PREFIX}_notebook_writes_total{labels('WriteRelease')} 1",
+        f"# TYPE {PREFIX}_seconds_total counter",
+    ]
+    # Each timed stage has a duration, exported with all digits
+    calls = [line for line in lines if line.startswith(f"{PREFIX}_calls_total{{")]
+    assert [line.rsplit(" ", 1)[0] for line in seconds] == [
+        line.rsplit(" ", 1)[0].replace("_calls_", "_seconds_") for line in calls
+    ]
+    for line in seconds:
+        value = line.rsplit(" ", 1)[1]
+        assert float(value) > 0 and repr(float(value)) == value
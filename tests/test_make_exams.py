@@ -0,0 +1,208 @@
+import json
+import os
+
+from traitlets.config import Config
+
+from examgenerator import ExamGenerator
+from examgenerator.tasks import OrderedTaskGroup
+
+from .helpers import (
+    SCRAMBLER,
+    SCRAMBLER_WITH_EXTRA_FILES,
+    STATEFUL_SCRAMBLER,
+    make_generator,
+    run_python,
+    tree_hash,
+    write_task,
+)
+
+FAILING_SCRAMBLER = """
+def replacement_variables(seed):
+    if seed == 3:
+        raise ValueError("broken seed")
+    return dict(a=seed)
+"""
+
+FAILING_BATCH_SCRAMBLER = (
+    FAILING_SCRAMBLER
+    + """
+
+def replacement_variables_batch(seeds):
+    raise ValueError("broken batch")
+"""
+)
+
+
+def test_scrambler_failing_for_one_student(tmp_path):
+    tasks = OrderedTaskGroup(
+        [
+            write_task(tmp_path / "pool", "p0", "ok", scrambler=SCRAMBLER),
+            write_task(tmp_path / "pool", "p1", "broken", scrambler=FAILING_SCRAMBLER),
+        ]
+    )
+    generator = ExamGenerator(str(tmp_path / "out"), "exam")
+    results = generator.make_exams({f"student{i}": i for i in range(5)}, tasks)
+
+    assert list(results) == [f"student{i}" for i in range(5)]
+    failed = [student for student, result in results.items() if not result.succeeded]
+    assert failed == ["student3"]
+    assert "broken seed" in results["student3"].error
+    assert results["student3"].tasks == ["p0/ok", "p1/broken"]
+    for student in ["student0", "student4"]:
+        assert os.path.exists(
+            tmp_path / "out" / "release" / "exam" / student / "exam.ipynb"
+        )
+    assert not os.path.exists(tmp_path / "out" / "release" / "exam" / "student3")
+
+
+def test_failing_batch_hook_fails_only_students_with_the_task(tmp_path):
+    broken = write_task(
+        tmp_path / "pool", "p1", "broken", scrambler=FAILING_BATCH_SCRAMBLER
+    )
+    ok = write_task(tmp_path / "pool", "p0", "ok", scrambler=SCRAMBLER)
+
+    class Group(OrderedTaskGroup):
+        def get_tasks(self, seed=None, source=False):
+            return [
+                task for task in super().get_tasks(seed, source) if seed or task is ok
+            ]
+
+    generator = ExamGenerator(str(tmp_path / "out"), "exam")
+    results = generator.make_exams({"student0": 0, "student1": 1}, Group([ok, broken]))
+
+    assert results["student0"].succeeded
+    assert "broken batch" in results["student1"].error
+
+
+def test_workers_use_traits_set_on_the_instance(tmp_path, pool):
+    tasks = OrderedTaskGroup(pool[:2])
+    generator = ExamGenerator(str(tmp_path / "out"), "exam")
+    generator.incremental = True
+    results = generator.make_exams({"student0": 0, "student1": 1}, tasks, workers=2)
+
+    assert all(result.succeeded for result in results.values())
+    for student in results:
+        assert os.path.exists(generator.build_state_path(student))
+
+
+def test_serial_rerun_after_workers_skips_all_students(tmp_path, pool):
+    students = {f"student{i}": i for i in range(3)}
+    tasks = OrderedTaskGroup(pool[:2])
+    generator = make_generator(tmp_path / "out", incremental=True)
+    results = generator.make_exams(students, tasks, workers=2)
+    assert all(result.succeeded for result in results.values())
+
+    results = make_generator(tmp_path / "out", incremental=True).make_exams(
+        students, tasks
+    )
+    assert all(result.skipped for result in results.values())
+
+
+def test_traits_that_do_not_change_the_exams_do_not_rebuild(tmp_path, pool):
+    tasks = OrderedTaskGroup(pool[:2])
+    config = Config()
+    config.ExamGenerator.incremental = True
+    assert ExamGenerator(str(tmp_path / "out"), "exam", config).make_exam(
+        "student0", tasks, seed=0
+    )
+
+    config.ExamGenerator.task_workers = 2
+    config.ExamGenerator.copy_strategy = "hardlink"
+    generator = ExamGenerator(str(tmp_path / "out"), "exam", config)
+    generator.reuse_workspace = True
+    generator.keep_notebooks_in_memory = True
+    assert not generator.make_exam("student0", tasks, seed=0)
+    generator.close()
+
+    config.ExamGenerator.sanitizers = []
+    assert ExamGenerator(str(tmp_path / "out"), "exam", config).make_exam(
+        "student0", tasks, seed=0
+    )
+
+
+INCREMENTAL_RUN = """
+import json
+
+from traitlets.config import Config
+
+from examgenerator import ExamGenerator
+from examgenerator.sampling.constraints import PoolConstraint, TasksPerPoolConstraint
+from examgenerator.tasks import SampledTaskGroup, Task
+
+tasks = [
+    Task(f"pool{{p}}", f"task{{t}}", root={root!r}) for p in range(6) for t in range(2)
+]
+group = SampledTaskGroup(tasks, [TasksPerPoolConstraint(1)], PoolConstraint(3))
+config = Config()
+config.ExamGenerator.incremental = True
+generator = ExamGenerator({dst!r}, "exam", config)
+results = generator.make_exams({{f"student{{i}}": i for i in range(10)}}, group)
+print(json.dumps({{student: result.skipped for student, result in results.items()}}))
+"""
+
+
+def test_incremental_rerun_in_a_new_interpreter_skips_all_students(tmp_path):
+    for p in range(6):
+        for t in range(2):
+            write_task(tmp_path / "pool", f"pool{p}", f"task{t}")
+    code = INCREMENTAL_RUN.format(
+        root=str(tmp_path / "pool"), dst=str(tmp_path / "out")
+    )
+
+    assert not any(json.loads(run_python(code, hash_seed=1)).values())
+    before = tree_hash(tmp_path / "out")
+    assert all(json.loads(run_python(code, hash_seed=2)).values())
+    assert tree_hash(tmp_path / "out") == before
+
+
+def test_scramblers_without_batch_hook_run_when_the_exam_is_built(tmp_path):
+    task = write_task(tmp_path / "pool", "p0", "stateful", scrambler=STATEFUL_SCRAMBLER)
+    students = {f"student{i}": i for i in range(4)}
+    generator = make_generator(tmp_path / "out", incremental=True)
+    results = generator.make_exams(students, OrderedTaskGroup([task]))
+
+    assert all(result.succeeded for result in results.values())
+    for student, seed in students.items():
+        path = tmp_path / "out" / "release" / "exam" / student / "files" / "data"
+        assert (path / "seed.csv").read_text() == str(seed)
+
+    # Up to date students are skipped before their scramblers are called
+    log = (tmp_path / "pool" / "calls.log").read_text()
+    assert len(log.splitlines()) == len(students)
+    results = generator.make_exams(students, OrderedTaskGroup([task]))
+    assert all(result.skipped for result in results.values())
+    assert (tmp_path / "pool" / "calls.log").read_text() == log
+
+
+def test_deduplicated_exams_equal_copied_exams(tmp_path):
+    tasks = OrderedTaskGroup(
+        [
+            write_task(
+                tmp_path / "pool", "p0", "t0", scrambler=SCRAMBLER_WITH_EXTRA_FILES
+            ),
+            write_task(tmp_path / "pool", "p1", "t1"),
+        ]
+    )
+    students = {f"student{i}": i for i in range(3)}
+    for deduplicate_files in [False, True]:
+        dst = tmp_path / str(deduplicate_files)
+        with make_generator(dst, deduplicate_files=deduplicate_files) as generator:
+            results = generator.make_exams(students, tasks)
+        assert all(result.succeeded for result in results.values())
+
+    for directory in ["release", "solution"]:
+        assert tree_hash(tmp_path / "True" / directory) == tree_hash(
+            tmp_path / "False" / directory
+        )
+    assert not (tmp_path / "False" / ".store").exists()
+
+    # common.csv, t0.csv and t1.csv are shared, generated.csv differs per student
+    blobs = [
+        os.path.join(dirpath, file)
+        for dirpath, _, files in os.walk(tmp_path / "True" / ".store" / "objects")
+        for file in files
+    ]
+    assert len(blobs) == 3 + len(students)
+    # Each blob is linked into the release and solution of the students that have it
+    links = sorted(os.stat(blob).st_nlink for blob in blobs)
+    assert links == [1 + 2] * len(students) + [1 + 2 * len(students)] * 3
@@ -0,0 +1,63 @@
+from examgenerator.preprocessors import MakeExam, makeexam
+
+from .helpers import make_generator
+
+
+class KernelSpec:
+    def __init__(self, display_name):
+        self.display_name = display_name
+
+    def to_dict(self):
+        return dict(display_name=self.display_name)
+
+
+def install_kernels(monkeypatch):
+    """Replace the kernelspec lookup by one that counts the lookups"""
+    kernels = dict(python3="Python 3")
+    lookups = []
+
+    class KernelSpecManager:
+        def get_kernel_spec(self, kernel):
+            lookups.append(kernel)
+            return KernelSpec(kernels[kernel])
+
+    monkeypatch.setattr(makeexam, "KernelSpecManager", KernelSpecManager)
+    return kernels, lookups
+
+
+def display_name(preprocessor):
+    nb = preprocessor.new_notebook(dict(kernel="python3", replacements=dict(), seed=0))
+    return nb.metadata["kernelspec"]["display_name"]
+
+
+def get_make_exam(generator):
+    (preprocessor,) = [p for p in generator._preprocessors if isinstance(p, MakeExam)]
+    return preprocessor
+
+
+def test_kernelspecs_are_looked_up_once_until_the_cache_is_cleared(monkeypatch):
+    kernels, lookups = install_kernels(monkeypatch)
+    preprocessor = MakeExam()
+    assert [display_name(preprocessor) for _ in range(3)] == ["Python 3"] * 3
+    assert lookups == ["python3"]
+
+    kernels["python3"] = "Python 3.12"
+    assert display_name(preprocessor) == "Python 3"
+    preprocessor.clear_cache()
+    assert display_name(preprocessor) == "Python 3.12"
+    assert lookups == ["python3"] * 2
+
+
+def test_kernelspec_cache_does_not_outlive_a_generator(tmp_path, monkeypatch):
+    kernels, lookups = install_kernels(monkeypatch)
+    with make_generator(tmp_path / "first") as generator:
+        assert display_name(get_make_exam(generator)) == "Python 3"
+        kernels["python3"] = "Python 3.12"
+        assert display_name(get_make_exam(generator)) == "Python 3"
+        generator.clear_kernelspec_cache()
+        assert display_name(get_make_exam(generator)) == "Python 3.12"
+
+    kernels["python3"] = "Python 3.13"
+    with make_generator(tmp_path / "second") as generator:
+        assert display_name(get_make_exam(generator)) == "Python 3.13"
+    assert lookups == ["python3"] * 3
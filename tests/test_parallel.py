@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from examgenerator.sampling.constraints import PoolConstraint, TasksPerPoolConstraint
+from examgenerator.tasks import OrderedTaskGroup, SampledTaskGroup
+
+from .helpers import STATEFUL_SCRAMBLER, make_generator, tree_hash, write_task
+
+RENDEZVOUS_SCRAMBLER = """
+import os
+import time
+
+# The directory of all pools, outside of the task
+ROOT = os.path.join(os.path.dirname(__file__), *[os.pardir] * 3)
+
+
+def replacement_variables(seed):
+    return dict(a=seed)
+
+
+def create_extra_files(seed, path):
+    # Wait until the calls for two students have started
+    open(os.path.join(ROOT, "started-{}".format(seed)), "w").close()
+    deadline = time.monotonic() + 10
+    while sum(name.startswith("started-") for name in os.listdir(ROOT)) < 2:
+        if time.monotonic() > deadline:
+            raise TimeoutError("create_extra_files was not called concurrently")
+        time.sleep(0.01)
+"""
+
+STUDENTS = {f"student{i}": i for i in range(6)}
+
+
+def make_group(pool):
+    return SampledTaskGroup(
+        pool, [TasksPerPoolConstraint(2)], PoolConstraint(3), permute=True
+    )
+
+
+def build_serial(dst, pool, **traits):
+    generator = make_generator(dst, **traits)
+    for student, seed in STUDENTS.items():
+        generator.make_exam(student, make_group(pool), seed=seed)
+    generator.close()
+
+
+@pytest.mark.parametrize(
+    "mode, traits",
+    [
+        ("workers", dict()),
+        ("async", dict()),
+        ("serial", dict(task_workers=2)),
+        ("serial", dict(reuse_workspace=True, copy_strategy="hardlink")),
+        ("serial", dict(keep_notebooks_in_memory=True)),
+        ("workers", dict(task_workers=2, reuse_workspace=True)),
+    ],
+)
+def test_parallel_output_equals_serial_output(tmp_path, pool, mode, traits):
+    build_serial(tmp_path / "serial", pool)
+
+    dst = tmp_path / "candidate"
+    if mode == "serial":
+        build_serial(dst, pool, **traits)
+    else:
+        generator = make_generator(dst, **traits)
+        if mode == "workers":
+            results = generator.make_exams(STUDENTS, make_group(pool), workers=2)
+        else:
+            results = asyncio.run(
+                generator.make_exams_async(STUDENTS, make_group(pool), concurrency=3)
+            )
+        generator.close()
+        assert all(result.succeeded for result in results.values())
+
+    assert tree_hash(dst) == tree_hash(tmp_path / "serial")
+
+
+def test_async_exams_with_a_stateful_scrambler(tmp_path):
+    pool = [
+        write_task(
+            tmp_path / "pool", f"pool{p}", f"task{t}", scrambler=STATEFUL_SCRAMBLER
+        )
+        for p in range(3)
+        for t in range(3)
+    ]
+    build_serial(tmp_path / "serial", pool)
+
+    dst = tmp_path / "candidate"
+    generator = make_generator(dst, task_workers=2)
+    results = asyncio.run(
+        generator.make_exams_async(STUDENTS, make_group(pool), concurrency=3)
+    )
+    generator.close()
+
+    assert all(result.succeeded for result in results.values())
+    for student, seed in STUDENTS.items():
+        path = dst / "release" / "exam" / student / "files" / "data" / "seed.csv"
+        assert path.read_text() == str(seed)
+    assert tree_hash(dst) == tree_hash(tmp_path / "serial")
+
+
+def test_scramblers_of_different_students_run_concurrently(tmp_path):
+    task = write_task(tmp_path / "pool", "p0", "t0", scrambler=RENDEZVOUS_SCRAMBLER)
+    generator = make_generator(tmp_path / "out")
+    results = asyncio.run(
+        generator.make_exams_async(
+            {"student0": 0, "student1": 1}, OrderedTaskGroup([task]), concurrency=2
+        )
+    )
+    generator.close()
+
+    assert all(result.succeeded for result in results.values())
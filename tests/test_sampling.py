@@ -0,0 +1,268 @@
+import random
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from examgenerator.sampling import CohortSampler, TaskSampler, analyze_samples
+from examgenerator.sampling.constraints import (
+    PoolConstraint,
+    TasksConstraint,
+    TasksPerPoolConstraint,
+    TasksWithScoreConstraint,
+    TotalPointsConstraint,
+)
+from examgenerator.tasks import Task
+
+from .helpers import run_python
+
+
+def count_exams(tasks, n_pools, extra_tasks, total_points):
+    """Count the exams with one task per pool and extra tasks by enumerating them"""
+    count = 0
+    for exam in combinations(tasks, n_pools + extra_tasks):
+        pools = {task.pool for task in exam}
+        if len(pools) == n_pools and sum(task.points for task in exam) == total_points:
+            count += 1
+    return count
+
+
+def random_tasks(rng):
+    return [
+        Task(f"p{p}", f"t{t}", points=rng.randint(1, 4))
+        for p in range(rng.randint(2, 4))
+        for t in range(rng.randint(1, 3))
+    ]
+
+
+def test_validator_accepts_exams_that_the_uniform_sampler_can_draw():
+    tasks = [
+        Task("p0", "t0", points=4),
+        Task("p1", "t0", points=1),
+        Task("p1", "t1", points=4),
+        Task("p1", "t2", points=2),
+        Task("p2", "t0", points=2, tags=("hard",)),
+    ]
+    sampler = TaskSampler(
+        tasks,
+        [TasksPerPoolConstraint(1), TasksConstraint(1), TotalPointsConstraint(8)],
+        PoolConstraint(2),
+    )
+    assert sampler.uniform.n_exams() == 1
+    exam = sampler.get_tasks(seed=0)
+    assert sorted(task.relpath for task in exam) == ["p1/t1", "p1/t2", "p2/t0"]
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_validator_and_uniform_sampler_agree_on_feasibility(seed):
+    rng = random.Random(seed)
+    tasks = random_tasks(rng)
+    n_pools = rng.randint(1, len({task.pool for task in tasks}))
+    extra_tasks = rng.randint(0, 2)
+    size = n_pools + extra_tasks
+    total_points = rng.randint(size, 3 * size)
+    expected = count_exams(tasks, n_pools, extra_tasks, total_points)
+
+    def make_sampler():
+        return TaskSampler(
+            tasks,
+            [
+                TasksPerPoolConstraint(1),
+                TasksConstraint(extra_tasks),
+                TotalPointsConstraint(total_points),
+            ],
+            PoolConstraint(n_pools),
+        )
+
+    if expected == 0:
+        with pytest.raises(AssertionError):
+            make_sampler()
+        return
+    sampler = make_sampler()
+    assert sampler.uniform.n_exams() == expected
+    for i in range(5):
+        exam = sampler.get_tasks(seed=i)
+        assert sum(task.points for task in exam) == total_points
+        assert len({task.pool for task in exam}) == n_pools
+
+
+SAMPLE_IN_SUBPROCESS = """
+from examgenerator.sampling import TaskSampler
+from examgenerator.sampling.constraints import PoolConstraint, TasksPerPoolConstraint
+from examgenerator.tasks import Task
+
+tasks = [Task(f"pool{p}", f"t{t}", points=1) for p in range(8) for t in range(3)]
+sampler = TaskSampler(tasks, [TasksPerPoolConstraint(1)], PoolConstraint(3))
+for seed in range(20):
+    print(sorted(task.relpath for task in sampler.get_tasks(seed=seed)))
+"""
+
+
+def test_samples_do_not_depend_on_the_hash_seed():
+    samples = {run_python(SAMPLE_IN_SUBPROCESS, hash_seed) for hash_seed in [1, 2]}
+    assert len(samples) == 1
+
+
+def small_pool():
+    return [
+        Task("p0", "t0", points=1),
+        Task("p0", "t1", points=1),
+        Task("p1", "t0", points=2),
+        Task("p2", "t0", points=3),
+        Task("p2", "t1", points=1),
+    ]
+
+
+def test_analyze_samples_counts_points_tasks_and_pairs():
+    sampler = TaskSampler(small_pool(), [TasksPerPoolConstraint(1)])
+    report = analyze_samples(sampler, [[0, 2, 3], [2, 1, 4], [3, 0, 2], [0, 2, 4]])
+
+    assert report.n_samples == 4
+    assert report.points == {4: 2, 6: 2}
+    assert (report.min_points, report.max_points, report.mean_points) == (4, 6, 5.0)
+    assert report.task_frequency == {
+        "p0/t0": 0.75,
+        "p0/t1": 0.25,
+        "p1/t0": 1.0,
+        "p2/t0": 0.5,
+        "p2/t1": 0.5,
+    }
+    assert report.cooccurrence[("p0/t0", "p1/t0")] == 3
+    assert report.cooccurrence[("p0/t0", "p2/t0")] == 2
+    assert report.cooccurrence[("p1/t0", "p2/t1")] == 2
+    assert ("p0/t0", "p0/t1") not in report.cooccurrence
+    assert sum(report.cooccurrence.values()) == 4 * 3
+    assert report.pool_coverage == {"p0": 1.0, "p1": 1.0, "p2": 1.0}
+    assert report.tasks_per_pool == {"p0": {1: 4}, "p1": {1: 4}, "p2": {1: 4}}
+
+
+def test_empty_report():
+    report = analyze_samples(TaskSampler(small_pool(), [TasksPerPoolConstraint(1)]), [])
+    assert report.n_samples == 0
+    assert report.min_points is None
+    assert report.max_points is None
+    assert report.mean_points is None
+    assert not report.equal_points
+    assert set(report.task_frequency.values()) == {0}
+
+
+def test_simulate_reports_the_sampled_exams():
+    sampler = TaskSampler(
+        small_pool(), [TasksPerPoolConstraint(1)], PoolConstraint(2), permute=True
+    )
+    report = sampler.simulate(4000)
+
+    assert report.n_samples == 4000
+    assert report == analyze_samples(sampler, sampler.sample_batch(range(4000)))
+    # Two of three pools are in each exam, p1 has a single task
+    assert sum(report.points.values()) == 4000
+    assert report.task_frequency["p1/t0"] == report.pool_coverage["p1"]
+    for pool, coverage in report.pool_coverage.items():
+        assert coverage == pytest.approx(2 / 3, abs=0.05)
+        assert report.tasks_per_pool[pool] == {
+            0: round(4000 * (1 - coverage)),
+            1: round(4000 * coverage),
+        }
+    assert report.task_frequency["p0/t0"] == pytest.approx(1 / 3, abs=0.05)
+    assert ("p0/t0", "p0/t1") not in report.cooccurrence
+    assert sum(report.cooccurrence.values()) == 4000
+    # The task of p2 is drawn from the score that comes last among the chosen pools:
+    # 3 points next to p0 and 1 point next to p1
+    assert ("p0/t0", "p2/t1") not in report.cooccurrence
+    assert ("p1/t0", "p2/t0") not in report.cooccurrence
+    with_p0 = (
+        report.cooccurrence[("p0/t0", "p2/t0")]
+        + report.cooccurrence[("p0/t1", "p2/t0")]
+    )
+    assert report.points == {3: 4000 - with_p0, 4: with_p0}
+    assert report.task_frequency["p2/t0"] * 4000 == with_p0
+
+
+def test_simulate_in_worker_processes_equals_serial_simulation():
+    sampler = TaskSampler(small_pool(), [TasksPerPoolConstraint(1)], PoolConstraint(2))
+    assert sampler.simulate(500, first_seed=7, workers=2) == sampler.simulate(
+        500, first_seed=7
+    )
+
+
+@pytest.mark.parametrize(
+    "constraints, pool_constraint",
+    [
+        ([TasksPerPoolConstraint(1)], PoolConstraint(2)),
+        ([TasksPerPoolConstraint(1), TasksConstraint(1)], None),
+        ([TasksConstraint(3)], PoolConstraint(2)),
+    ],
+)
+def test_sampling_by_pool_matches_the_score_dict(constraints, pool_constraint):
+    sampler = TaskSampler(small_pool(), constraints, pool_constraint)
+    assert sampler.by_pool
+    by_pool = Counter(tuple(sample) for sample in sampler.sample_batch(range(6000)))
+    sampler.by_pool = False
+    by_score = Counter(tuple(sample) for sample in sampler.sample_batch(range(6000)))
+
+    # Both draw the same exams with the tasks in the same order and frequency
+    assert set(by_pool) == set(by_score)
+    for sample, count in by_score.items():
+        assert by_pool[sample] == pytest.approx(count, rel=0.3, abs=60)
+
+
+def test_batches_equal_samples_of_single_seeds():
+    sampler = TaskSampler(
+        small_pool(),
+        [TasksWithScoreConstraint(1, 1), TasksPerPoolConstraint(1)],
+        PoolConstraint(2),
+    )
+    assert not sampler.by_pool
+    assert sampler.sample_batch(range(50)) == [
+        sampler.sample_indices(seed) for seed in range(50)
+    ]
+
+
+def cohort_sampler(**kwargs):
+    tasks = [
+        Task(f"p{p}", f"t{t}", points=1 + (p + t) % 3)
+        for p in range(6)
+        for t in range(3)
+    ]
+    sampler = TaskSampler(
+        tasks,
+        [TasksPerPoolConstraint(1), TotalPointsConstraint(6)],
+        PoolConstraint(3),
+    )
+    return sampler, CohortSampler(sampler, **kwargs)
+
+
+STUDENTS = [f"student{i}" for i in range(30)]
+SEATS = {
+    student: [STUDENTS[j] for j in [i + 1, i + 6] if j < len(STUDENTS)]
+    for i, student in enumerate(STUDENTS)
+}
+
+
+@pytest.mark.parametrize("neighbours", [None, SEATS], ids=["row", "grid"])
+def test_cohort_exams_meet_the_constraints(neighbours):
+    sampler, cohort = cohort_sampler()
+    assignment = cohort.assign(STUDENTS, neighbours)
+
+    assert list(assignment) == STUDENTS
+    assert len(set(assignment.values())) == len(STUDENTS)
+    for seed in assignment.values():
+        exam = sampler.get_tasks(seed=seed)
+        assert len(exam) == 3
+        assert len({task.pool for task in exam}) == 3
+        assert sum(task.points for task in exam) == 6
+
+
+@pytest.mark.parametrize("neighbours", [None, SEATS], ids=["row", "grid"])
+def test_cohort_overlap_is_lower_than_the_overlap_of_independent_seeds(neighbours):
+    _, cohort = cohort_sampler()
+    independent = {student: seed for seed, student in enumerate(STUDENTS)}
+    assignment = cohort.assign(STUDENTS, neighbours)
+
+    assert cohort.cost(assignment, neighbours) < cohort.cost(independent, neighbours)
+
+
+def test_cohort_assignment_is_deterministic():
+    assignments = [cohort_sampler()[1].assign(STUDENTS, SEATS) for _ in range(2)]
+    assert assignments[0] == assignments[1]
+    assert cohort_sampler(first_seed=100)[1].assign(STUDENTS, SEATS) != assignments[0]
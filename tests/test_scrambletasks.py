@@ -0,0 +1,66 @@
+import string
+
+import pytest
+
+from examgenerator.preprocessors.scrambletasks import ScrambleTemplate, compile_template
+
+
+class Placeholders(dict):
+    """Keep variables without a value as prefixed placeholders"""
+
+    def __missing__(self, key):
+        return "{{" + key + "}}"
+
+
+def reference(source, prefix, replacements):
+    """Render a source with string.Template, escaping the literal $ of the source"""
+    source = ScrambleTemplate.pattern.sub(
+        lambda match: "${" + f"{prefix}_{match.group(1)}" + "}",
+        source.replace("$", "$$"),
+    )
+    values = Placeholders({name: str(value) for name, value in replacements.items()})
+    return string.Template(source).substitute(values)
+
+
+REPLACEMENTS = dict(p_t_a=42, p_t_b="x", p_t_c="{{ a }} costs $5")
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "",
+        "no variables",
+        "{{ a }}",
+        "{{a}} and {{  b }}",
+        "missing {{ d }} and {{ a }}",
+        "repeated {{ a }}, {{a}} and {{ a  }}",
+        "literal $ and $$ and ${a} and $a before {{ b }}",
+        "a value with a variable and a $: {{ c }}",
+        "{{ a }}{{ b }}{{ a }}",
+        "not a variable: {{ a b }}, { a }, {{}}",
+        "{{ a }}\n```python\nx = {{ b }}\n```",
+    ],
+)
+def test_rendering_equals_template_substitution(source):
+    template = ScrambleTemplate(source)
+    for replacements in [dict(), REPLACEMENTS]:
+        assert template.render("p_t", replacements) == reference(
+            source, "p_t", replacements
+        )
+
+
+def test_variables_of_a_template():
+    template = ScrambleTemplate("{{ a }} {{a}} {{ b }} $c {{ a b }}")
+    assert template.variables == {"a", "b"}
+    assert ScrambleTemplate("$ {{ }}").variables == set()
+
+
+def test_missing_and_repeated_variables():
+    template = ScrambleTemplate("{{ a }} + {{ a }} = {{ b }} $")
+    assert template.render("p_t", dict(p_t_a=1)) == "1 + 1 = {{p_t_b}} $"
+    assert template.render("p_t") == "{{p_t_a}} + {{p_t_a}} = {{p_t_b}} $"
+
+
+def test_templates_are_compiled_once_per_source():
+    assert compile_template("{{ a }}") is compile_template("{{ a }}")
+    assert compile_template("{{ a }}") is not compile_template("{{ b }}")
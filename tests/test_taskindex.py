@@ -0,0 +1,88 @@
+import json
+import os
+
+import nbformat
+
+from examgenerator.sampling.constraints import PoolConstraint, TasksPerPoolConstraint
+from examgenerator.tasks import SampledTaskGroup, Task, TaskIndex
+
+from .helpers import write_task
+
+
+def forbid_reads(monkeypatch):
+    """Fail if a notebook is read instead of looked up in the index"""
+
+    def read_task_info(self, task):
+        raise AssertionError(f"{task.relpath} was read")
+
+    monkeypatch.setattr(TaskIndex, "read_task_info", read_task_info)
+
+
+def set_points(task, points):
+    nb = nbformat.read(task.notebook_path, as_version=4)
+    nb.cells[-1].metadata["nbgrader"]["points"] = points
+    nbformat.write(nb, task.notebook_path)
+
+
+def test_index_is_persisted(tmp_path, monkeypatch):
+    task = write_task(tmp_path / "pool", "p0", "t0", points=3)
+    index = TaskIndex(str(tmp_path / "index" / "tasks.json"))
+    assert index.get(task).points == 3
+    index.save()
+
+    forbid_reads(monkeypatch)
+    index = TaskIndex(str(tmp_path / "index" / "tasks.json"))
+    assert index.get(task).points == 3
+    assert not index.dirty
+
+
+def test_changed_notebooks_are_read_again(tmp_path):
+    task = write_task(tmp_path / "pool", "p0", "t0", points=3)
+    index = TaskIndex()
+    assert index.get(task).points == 3
+
+    set_points(task, 12)
+    os.utime(task.notebook_path, ns=(10**18, 10**18))
+    assert index.get(task).points == 12
+
+
+def test_index_of_another_version_is_rebuilt(tmp_path):
+    task = write_task(tmp_path / "pool", "p0", "t0", points=3)
+    path = tmp_path / "tasks.json"
+    key = os.path.abspath(task.notebook_path)
+    entry = dict(stamp=TaskIndex().stamp(task), info=dict(points=5))
+    path.write_text(json.dumps(dict(version=1, tasks={key: entry})))
+
+    index = TaskIndex(str(path))
+    assert index.get(task).points == 3
+    index.save()
+    assert json.loads(path.read_text())["version"] == TaskIndex.version
+
+
+def test_sampler_looks_up_points_in_the_index(tmp_path, monkeypatch):
+    for p in range(3):
+        for t in range(2):
+            write_task(tmp_path / "pool", f"p{p}", f"t{t}", points=1 + t)
+
+    def make_group():
+        tasks = [
+            Task(f"p{p}", f"t{t}", root=str(tmp_path / "pool"))
+            for p in range(3)
+            for t in range(2)
+        ]
+        group = SampledTaskGroup(
+            tasks,
+            [TasksPerPoolConstraint(1)],
+            PoolConstraint(2),
+            index=TaskIndex(str(tmp_path / "tasks.json")),
+        )
+        return tasks, group
+
+    make_group()
+    index = json.loads((tmp_path / "tasks.json").read_text())
+    assert len(index["tasks"]) == 6
+
+    forbid_reads(monkeypatch)
+    tasks, group = make_group()
+    assert [task.points for task in tasks] == [1, 2] * 3
+    assert len(group.get_tasks(seed=0)) == 2